@@ -0,0 +1,353 @@
+# corpus.py
+import json
+import random
+from urllib.parse import urljoin
+
+from paths import BENCHMARKS_DIR
+
+from constants import (
+    DOWNLOADS_URL, EXPECTED_STATUS, MAIN_DOC_URL, PEPS_URL, WHATS_NEW_URL)
+
+CORPUS_DIR = BENCHMARKS_DIR / 'corpus'
+MANIFEST_NAME = 'manifest.json'
+SEED = 2023
+PEP_COUNT = 300
+WHATS_NEW_VERSIONS = [f'3.{minor}' for minor in range(12, -1, -1)] + [
+    f'2.{minor}' for minor in range(7, -1, -1)]
+ARCHIVE_NAMES = (
+    'python-3.11.1-docs-pdf-a4.zip',
+    'python-3.11.1-docs-pdf-letter.zip',
+    'python-3.11.1-docs-html.zip',
+    'python-3.11.1-docs-text.zip',
+)
+ARCHIVE_SIZE = 2 ** 20
+# разметка повторяет страницы Sphinx и peps.python.org: навигация,
+# вложенные секции, ссылки, литералы и подсвеченные блоки кода.
+# Объём разбора определяется разметкой, а не текстом, поэтому
+# предложения взяты из настоящих PEP и повторяются
+SENTENCES = (
+    'This PEP proposes adding a new keyword argument to the constructor.',
+    'The reference implementation is available as a pull request.',
+    'Existing code that relies on the old behaviour will continue to work.',
+    'A deprecation warning will be emitted for one release before removal.',
+    'Several alternatives were discussed on the mailing list and rejected.',
+    'The change is backwards compatible for all documented use cases.',
+    'Type checkers are expected to treat the new form as equivalent.',
+    'The steering council accepted the proposal with minor modifications.',
+    'Performance measurements show no regression on the benchmark suite.',
+    'Third party libraries may need to update their C extension modules.',
+)
+NAMES = (
+    'os.stat', 'asyncio.TaskGroup', 'typing.Self', 'sys.exception',
+    'contextlib.chdir', 'enum.StrEnum', 'math.cbrt', 'tomllib.load',
+    'functools.cache', 'dataclasses.field', 'pathlib.Path.walk',
+)
+CODE_LINES = (
+    '<span class="k">def</span> <span class="nf">spam</span>'
+    '<span class="p">(</span><span class="n">eggs</span>'
+    '<span class="p">:</span> <span class="nb">int</span>'
+    '<span class="p">)</span> <span class="o">-&gt;</span> '
+    '<span class="nb">str</span><span class="p">:</span>',
+    '    <span class="k">return</span> <span class="sa">f</span>'
+    '<span class="s2">&quot;</span><span class="si">{</span>'
+    '<span class="n">eggs</span><span class="si">}</span>'
+    '<span class="s2">&quot;</span>',
+    '<span class="gp">&gt;&gt;&gt; </span><span class="n">spam</span>'
+    '<span class="p">(</span><span class="mi">42</span>'
+    '<span class="p">)</span>',
+    '<span class="go">&#39;42&#39;</span>',
+)
+# коды таблицы PEP 0 и категории, в которые попадает статья;
+# в числовом указателе статья встречается ещё раз
+CATEGORIES = (
+    ('Meta-PEPs (PEPs about PEPs or Processes)', 'PA'),
+    ('Other Informational PEPs', 'IA'),
+    ('Provisional PEPs (provisionally accepted; interface may still change)',
+     'SP'),
+    ('Accepted PEPs (accepted; may not be implemented yet)', 'SA'),
+    ('Open PEPs (under consideration)', 'S'),
+    ('Finished PEPs (done, with a stable interface)', 'SF'),
+    ('Historical Meta-PEPs and Informational PEPs', 'PF'),
+    ('Deferred PEPs (postponed pending further research or updates)', 'SD'),
+    ('Abandoned, Withdrawn, and Rejected PEPs', 'SR'),
+    ('Abandoned, Withdrawn, and Rejected PEPs', 'SW'),
+    ('Abandoned, Withdrawn, and Rejected PEPs', 'SS'),
+)
+RESERVED_PEPS = (801, 3099, 3100, 3199)
+
+
+def slug(text):
+    return '-'.join(text.lower().replace('.', '-').split())
+
+
+def headerlink(anchor):
+    return (f'<a class="headerlink" href="#{anchor}" '
+            'title="Permalink to this heading">¶</a>')
+
+
+def literal(name):
+    return ('<code class="docutils literal notranslate">'
+            f'<span class="pre">{name}</span></code>')
+
+
+def xref(name):
+    module = name.split('.')[0]
+    return (
+        f'<a class="reference internal" href="../library/{module}.html#'
+        f'{name}" title="{name}"><code class="xref py py-func docutils '
+        f'literal notranslate"><span class="pre">{name}()</span></code></a>')
+
+
+def paragraph(rnd):
+    parts = []
+    for sentence in rnd.choices(SENTENCES, k=4):
+        parts.append(sentence)
+        name = rnd.choice(NAMES)
+        parts.append(rnd.choice((literal, xref))(name))
+    issue = rnd.randrange(80000, 100000)
+    parts.append(
+        '(Contributed by Jane Doe in <a class="reference external" '
+        f'href="https://github.com/python/cpython/issues/{issue}">'
+        f'gh-{issue}</a>.)')
+    return f'<p>{" ".join(parts)}</p>\n'
+
+
+def code_block(rnd):
+    lines = '\n'.join(rnd.choices(CODE_LINES, k=6))
+    return (
+        '<div class="highlight-python3 notranslate"><div class="highlight">'
+        f'<pre><span></span>{lines}\n</pre></div></div>\n')
+
+
+def bullet_list(rnd):
+    items = ''.join(
+        f'<li><p>{xref(name)}: {rnd.choice(SENTENCES)}</p></li>'
+        for name in rnd.sample(NAMES, 4))
+    return f'<ul class="simple">{items}</ul>\n'
+
+
+def sections(rnd, titles, paragraphs, level=2):
+    # каждая секция верхнего уровня содержит две вложенные
+    html = []
+    for title in titles:
+        anchor = slug(title)
+        blocks = [
+            rnd.choice((paragraph, paragraph, code_block, bullet_list))(rnd)
+            for _ in range(paragraphs)]
+        nested = '' if level > 2 else sections(
+            rnd, [f'{title} details', f'{title} examples'],
+            max(paragraphs // 2, 1), level + 1)
+        html.append(
+            f'<section id="{anchor}"><h{level}>{title}{headerlink(anchor)}'
+            f'</h{level}>\n{"".join(blocks)}{nested}</section>\n')
+    return ''.join(html)
+
+
+def contents(titles):
+    return '<ul>' + ''.join(
+        f'<li><a class="reference internal" href="#{slug(title)}">'
+        f'{title}</a></li>' for title in titles) + '</ul>'
+
+
+def docs_page(title, body, sidebar=''):
+    return (
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, '
+        'initial-scale=1.0">'
+        f'<title>{title} — Python 3.12 documentation</title>'
+        '<link rel="stylesheet" href="../_static/pydoctheme.css">'
+        '<script src="../_static/documentation_options.js"></script>'
+        '</head><body><div class="mobile-nav"><nav class="nav-content">'
+        '<a href="https://www.python.org/" class="nav-logo">Python</a>'
+        '<form role="search" class="search" action="../search.html">'
+        '<input type="search" name="q"></form></nav></div>'
+        '<div class="related" role="navigation"><h3>Navigation</h3><ul>'
+        '<li class="right"><a href="../genindex.html">index</a></li>'
+        '<li><a href="../index.html">3.12 Documentation</a> »</li></ul>'
+        '</div><div class="document"><div class="documentwrapper">'
+        f'<div class="bodywrapper"><div class="body" role="main">{body}'
+        '</div></div></div><div class="sphinxsidebar" role="navigation">'
+        f'<div class="sphinxsidebarwrapper">{sidebar}</div></div></div>'
+        '<div class="footer">© Copyright 2001-2023, Python Software '
+        'Foundation.</div></body></html>')
+
+
+def pep_page(title, body, sidebar):
+    return (
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">'
+        f'<title>{title} | peps.python.org</title>'
+        '<link rel="stylesheet" href="../_static/style.css">'
+        '</head><body><header><a href="https://www.python.org/">Python'
+        '</a> » <a href="../pep-0000/">PEP Index</a> » '
+        f'{title}</header><article>{body}</article>'
+        '<nav id="pep-sidebar"><h2>Contents</h2>'
+        f'{sidebar}<br><a id="source" href="https://github.com/python/peps">'
+        'Page Source (GitHub)</a></nav></body></html>')
+
+
+def pep_statuses(rnd):
+    for number in range(1, PEP_COUNT + 1):
+        abbr = rnd.choice(CATEGORIES)[1]
+        yield number, abbr, rnd.choice(EXPECTED_STATUS[abbr[1:]])
+
+
+def pep_row(number, abbr, status, title):
+    href = f'pep-{number:04d}/'
+    return (
+        f'<tr class="row-{"odd" if number % 2 else "even"}">'
+        f'<td><abbr title="{status}">{abbr}</abbr></td>'
+        f'<td class="pep-number"><a class="pep reference internal" '
+        f'href="{href}" title="{title}">{number}</a></td>'
+        f'<td><a class="pep reference internal" href="{href}" '
+        f'title="{title}">{title}</a></td>'
+        '<td>Doe, Smith</td></tr>')
+
+
+def pep_table(caption, rows):
+    anchor = slug(caption)
+    return (
+        f'<section id="{anchor}"><h3>{caption}{headerlink(anchor)}</h3>'
+        '<table class="pep-zero-table docutils align-default">'
+        '<thead><tr class="row-odd"><th class="head">Type</th>'
+        '<th class="head">PEP</th><th class="head">Title</th>'
+        f'<th class="head">Authors</th></tr></thead><tbody>{"".join(rows)}'
+        '</tbody></table></section>\n')
+
+
+def pep_pages(rnd):
+    pages = {}
+    by_category = {}
+    numerical = []
+    titles = ['Abstract', 'Motivation', 'Rationale', 'Specification',
+              'Backwards Compatibility', 'Rejected Ideas', 'Copyright']
+    for number, abbr, status in pep_statuses(rnd):
+        title = f'PEP {number} – Proposal number {number}'
+        row = pep_row(number, abbr, status, title)
+        category = next(
+            name for name, code in CATEGORIES if code == abbr)
+        by_category.setdefault(category, []).append(row)
+        numerical.append(row)
+        pages[urljoin(PEPS_URL, f'pep-{number:04d}/')] = pep_page(
+            title,
+            f'<section id="pep-content"><h1 class="page-title">{title}</h1>'
+            '<dl class="rfc2822 field-list simple">'
+            '<dt class="field-odd">Author<span class="colon">:</span></dt>'
+            '<dd class="field-odd">Jane Doe &lt;jane at example.com&gt;, '
+            'John Smith &lt;john at example.com&gt;</dd>\n'
+            '<dt class="field-even">Discussions-To<span class="colon">:'
+            '</span></dt><dd class="field-even"><a class="reference '
+            'external" href="https://discuss.python.org/">Discourse '
+            'thread</a></dd>\n'
+            '<dt class="field-odd">Status<span class="colon">:</span></dt>'
+            f'<dd class="field-odd"><abbr title="{status}">{status}</abbr>'
+            '</dd>\n'
+            '<dt class="field-even">Type<span class="colon">:</span></dt>'
+            '<dd class="field-even">Standards Track</dd>\n'
+            '<dt class="field-odd">Created<span class="colon">:</span></dt>'
+            '<dd class="field-odd">13-Jul-2000</dd>\n'
+            '<dt class="field-even">Python-Version<span class="colon">:'
+            '</span></dt><dd class="field-even">3.12</dd>\n'
+            '<dt class="field-odd">Post-History<span class="colon">:'
+            '</span></dt><dd class="field-odd">14-Jul-2000, 01-Aug-2000'
+            '</dd></dl>'
+            f'{sections(rnd, titles, 3)}</section>',
+            contents(titles))
+    reserved = ''.join(
+        f'<tr><td></td><td>{number}</td><td>RESERVED</td><td>Doe</td></tr>'
+        for number in RESERVED_PEPS)
+    pages[PEPS_URL] = pep_page(
+        'PEP 0 – Index of Python Enhancement Proposals (PEPs)',
+        '<section id="pep-content"><h1 class="page-title">PEP 0 – Index '
+        'of Python Enhancement Proposals (PEPs)</h1>'
+        '<dl class="rfc2822 field-list simple"><dt class="field-odd">'
+        'Status<span class="colon">:</span></dt><dd class="field-odd">'
+        'Active</dd></dl>'
+        f'{sections(rnd, ["Introduction"], 2)}'
+        '<section id="index-by-category"><h2>Index by Category</h2>'
+        + ''.join(
+            pep_table(category, rows)
+            for category, rows in by_category.items())
+        + '</section><section id="numerical-index"><h2>Numerical Index'
+        '</h2>' + pep_table('All PEPs', numerical) + '</section>'
+        '<section id="reserved-pep-numbers"><h2>Reserved PEP Numbers</h2>'
+        '<table class="pep-zero-table docutils align-default"><tbody>'
+        f'{reserved}</tbody></table></section></section>',
+        contents(['Introduction', 'Index by Category', 'Numerical Index']))
+    return pages
+
+
+def docs_pages(rnd):
+    pages = {}
+    items = []
+    titles = ['Summary – Release highlights', 'New Features',
+              'Other Language Changes', 'New Modules', 'Improved Modules',
+              'Optimizations', 'Deprecated', 'Removed',
+              'Porting to Python {version}', 'Build Changes',
+              'C API Changes']
+    for version in WHATS_NEW_VERSIONS:
+        version_titles = [title.format(version=version) for title in titles]
+        anchor = f'what-s-new-in-python-{version.replace(".", "-")}'
+        items.append(
+            f'<li class="toctree-l1"><a class="reference internal" '
+            f'href="{version}.html">What’s New In Python {version}</a></li>')
+        pages[urljoin(WHATS_NEW_URL, f'{version}.html')] = docs_page(
+            f'What’s New In Python {version}',
+            f'<section id="{anchor}"><h1>What’s New In Python {version}'
+            f'{headerlink(anchor)}</h1>'
+            '<dl class="field-list simple"><dt class="field-odd">Editor'
+            '<span class="colon">:</span></dt>\n<dd class="field-odd">'
+            '<p>Editor Name</p>\n</dd></dl>'
+            f'{paragraph(rnd)}{sections(rnd, version_titles, 8)}</section>',
+            f'<h3>Table of Contents</h3>{contents(version_titles)}')
+    pages[WHATS_NEW_URL] = docs_page(
+        'What’s New in Python',
+        '<section id="what-s-new-in-python"><h1>What’s New in Python'
+        f'{headerlink("what-s-new-in-python")}</h1>{paragraph(rnd)}'
+        '<div class="toctree-wrapper compound"><ul>'
+        f'{"".join(items)}</ul></div></section>')
+    versions = ''.join(
+        f'<li><a href="https://docs.python.org/{version}/">'
+        f'Python {version} ({status})</a></li>'
+        for version, status in (
+            ('3.12', 'in development'), ('3.11', 'stable'),
+            ('3.10', 'security-fixes'), ('3.9', 'security-fixes'),
+            ('3.8', 'EOL'), ('2.7', 'EOL')))
+    pages[MAIN_DOC_URL] = docs_page(
+        'Python documentation',
+        '<h1>Python 3.12 documentation</h1>' + paragraph(rnd),
+        '<h3>Download</h3><p><a href="download.html">Download these '
+        'documents</a></p><h3>Docs by version</h3><ul>'
+        f'{versions}<li><a href="https://www.python.org/doc/versions/">'
+        'All versions</a></li></ul>')
+    pages[DOWNLOADS_URL] = docs_page('Download', (
+        '<section id="download-python-3-12-documentation">'
+        '<h1>Download Python 3.12 Documentation</h1>'
+        '<table class="docutils align-default"><tbody><tr>'
+        + ''.join(
+            f'<td><a class="reference external" href="archives/{name}">'
+            'Download</a></td>' for name in ARCHIVE_NAMES)
+        + '</tr></tbody></table></section>'))
+    return pages
+
+
+def synthetic_corpus():
+    rnd = random.Random(SEED)
+    pages = {**pep_pages(rnd), **docs_pages(rnd)}
+    return {url: html.encode('utf-8') for url, html in pages.items()}
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    # записанный корпус (см. record.py) используется, если он есть,
+    # иначе страницы генерируются детерминированно
+    manifest = corpus_dir / MANIFEST_NAME
+    if not manifest.exists():
+        return synthetic_corpus()
+    return {
+        url: (corpus_dir / file_name).read_bytes()
+        for url, file_name in json.loads(manifest.read_text()).items()}
+
+
+def archives():
+    return {
+        urljoin(DOWNLOADS_URL, f'archives/{name}'): bytes(ARCHIVE_SIZE)
+        for name in ARCHIVE_NAMES}
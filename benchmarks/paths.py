@@ -0,0 +1,8 @@
+# paths.py
+import sys
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCHMARKS_DIR.parent / 'src'
+# модули парсера импортируются так же, как при запуске src/main.py
+sys.path.append(str(SRC_DIR))
@@ -0,0 +1,54 @@
+# record.py
+import argparse
+import hashlib
+import json
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+from corpus import CORPUS_DIR, MANIFEST_NAME
+
+from constants import DOWNLOADS_URL, MAIN_DOC_URL, PEPS_URL, WHATS_NEW_URL
+
+
+def fetch(session, url):
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Запись корпуса страниц для бенчмарков')
+    parser.add_argument('--peps', type=int, default=300,
+                        help='Количество записываемых статей PEP')
+    args = parser.parse_args()
+    CORPUS_DIR.mkdir(exist_ok=True)
+    manifest = {}
+    with requests.Session() as session:
+        def save(url):
+            content = fetch(session, url)
+            file_name = hashlib.sha1(url.encode()).hexdigest() + '.html'
+            (CORPUS_DIR / file_name).write_bytes(content)
+            manifest[url] = file_name
+            return BeautifulSoup(content, 'lxml')
+
+        peps = save(PEPS_URL)
+        links = []
+        for row in peps('tr'):
+            if row.abbr and row.a and row.a['href'] not in links:
+                links.append(row.a['href'])
+        for link in links[:args.peps]:
+            save(urljoin(PEPS_URL, link))
+        whats_new = save(WHATS_NEW_URL)
+        for li in whats_new.select(
+                '#what-s-new-in-python div.toctree-wrapper li.toctree-l1'):
+            save(urljoin(WHATS_NEW_URL, li.a['href']))
+        save(MAIN_DOC_URL)
+        save(DOWNLOADS_URL)
+    (CORPUS_DIR / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# run.py
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from argparse import Namespace
+from pathlib import Path
+
+import requests_mock
+from requests_cache import CachedSession
+
+from paths import BENCHMARKS_DIR
+from corpus import archives, load_corpus
+
+import main
+from metrics import EXTRACT_PHASE, METRICS, NETWORK_PHASE, PARSE_PHASE
+
+# базовые значения зависят от машины, на которой записаны: сравнение
+# имеет смысл только на ней же, на другой машине базу нужно записать
+# заново с --update-baseline
+BASELINE_PATH = BENCHMARKS_DIR / 'baseline.json'
+MACHINE_KEY = 'machine'
+DEFAULT_THRESHOLD = 1.25
+# более короткие фазы слишком шумны для сравнения
+MIN_COMPARED_SECONDS = 0.05
+BENCHMARKED_MODES = ('pep', 'whats-new', 'latest-versions', 'download')
+PHASES = ('total', 'fetch', 'parse')
+REGRESSION_MESSAGE = (
+    'Регрессия в режиме {mode} ({phase}): {current:.3f} с, '
+    'базовое значение {baseline:.3f} с')
+MACHINE_MESSAGE = (
+    'Базовые значения записаны на другой машине ({baseline}), '
+    'сравнение может давать ложные регрессии; '
+    'запишите их заново с --update-baseline')
+
+
+def mock_session(pages, latency):
+    def respond(content):
+        def callback(request, context):
+            time.sleep(latency)
+            return content
+        return callback
+
+    session = CachedSession(backend='memory')
+    adapter = requests_mock.Adapter()
+    for url, content in pages.items():
+        adapter.register_uri(
+            requests_mock.ANY, url,
+            content=respond(content),
+            headers={'Content-Length': str(len(content))})
+    session.mount('https://', adapter)
+    return session
+
+
+def run_mode(mode, pages, cli_args, latency):
+    # загрузка и разбор берутся из таймеров фаз парсера: в разбор входят
+    # только построение дерева и извлечение значений, без пула потоков,
+    # записи индекса PEP и ожидания ответов
+    with tempfile.TemporaryDirectory() as base_dir:
+        main.BASE_DIR = Path(base_dir)
+        with mock_session(pages, latency) as session:
+            METRICS.reset()
+            start = time.perf_counter()
+            results = main.MODE_TO_FUNCTION[mode](session, cli_args)
+            if results is not None:
+                list(results)
+            total = time.perf_counter() - start
+    phases = METRICS.summary()['phases']
+    return {
+        'total': total,
+        'fetch': phases.get(NETWORK_PHASE, 0.0),
+        'parse': phases.get(PARSE_PHASE, 0.0) + phases.get(
+            EXTRACT_PHASE, 0.0)}
+
+
+def run(modes, repeat, cli_args, latency):
+    pages = {**load_corpus(), **archives()}
+    measurements = {}
+    for mode in modes:
+        runs = [run_mode(mode, pages, cli_args, latency)
+                for _ in range(repeat)]
+        measurements[mode] = {
+            phase: statistics.median(run[phase] for run in runs)
+            for phase in PHASES}
+    return measurements
+
+
+def machine():
+    return f'{platform.platform()}, {platform.machine()}, Python ' + (
+        platform.python_version())
+
+
+def regressions(measurements, baseline, threshold):
+    for mode, phases in measurements.items():
+        for phase, current in phases.items():
+            reference = baseline.get(mode, {}).get(phase)
+            if reference is None or reference < MIN_COMPARED_SECONDS:
+                continue
+            if current > reference * threshold:
+                yield REGRESSION_MESSAGE.format(
+                    mode=mode, phase=phase,
+                    current=current, baseline=reference)
+
+
+def configure_argument_parser():
+    parser = argparse.ArgumentParser(
+        description='Бенчмарки режимов парсера на записанном корпусе')
+    parser.add_argument('modes', nargs='*', default=BENCHMARKED_MODES,
+                        help='Измеряемые режимы')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Количество повторов, берётся медиана')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Количество параллельных загрузок')
+    parser.add_argument('--parser', default='bs4',
+                        help='Движок разбора страниц')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Искусственная задержка ответа, с')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое отношение к базовому значению')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Сохранить результаты как базовые')
+    return parser
+
+
+def main_benchmark():
+    args = configure_argument_parser().parse_args()
+    logging.disable(logging.INFO)
+    cli_args = Namespace(
+        workers=args.workers, parser=args.parser, revalidate=False)
+    measurements = run(args.modes, args.repeat, cli_args, args.latency)
+    for mode, phases in measurements.items():
+        print(mode, *(f'{phase}={phases[phase]:.3f}s' for phase in PHASES))
+    if args.update_baseline or not BASELINE_PATH.exists():
+        BASELINE_PATH.write_text(json.dumps(
+            {MACHINE_KEY: machine(), **measurements}, indent=2))
+        return 0
+    baseline = json.loads(BASELINE_PATH.read_text())
+    if baseline.get(MACHINE_KEY) != machine():
+        print(MACHINE_MESSAGE.format(baseline=baseline.get(MACHINE_KEY)))
+    found = list(regressions(measurements, baseline, args.threshold))
+    for message in found:
+        print(message)
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_benchmark())
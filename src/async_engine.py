@@ -0,0 +1,253 @@
+# async_engine.py
+import asyncio
+import json
+import logging
+import threading
+from time import perf_counter
+
+import aiohttp
+from aiohttp_client_cache import (
+    CacheBackend, CachedSession, FileBackend, SQLiteBackend)
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from constants import (
+    SQLITE_BACKEND, FILESYSTEM_BACKEND, MEMORY_BACKEND, COMPRESSED_BACKEND,
+    ENCODING, ASYNC_CACHE_SUFFIX, DEFAULT_POOL_SIZE, DEFAULT_RETRIES,
+    RETRY_MESSAGE)
+from metrics import METRICS
+from throttling import RETRY_STATUSES, backoff_delay
+
+CACHE_BACKENDS = {
+    SQLITE_BACKEND: SQLiteBackend,
+    FILESYSTEM_BACKEND: FileBackend,
+    MEMORY_BACKEND: CacheBackend,
+    # сжатое хранилище есть только у синхронного движка
+    COMPRESSED_BACKEND: SQLiteBackend,
+}
+CLIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class AsyncResponse:
+    # ответ aiohttp с интерфейсом requests.Response в объёме,
+    # который используют режимы парсера
+    def __init__(self, engine, raw, content=None, latency=None):
+        self.engine = engine
+        self.latency = latency
+        self.raw = raw
+        self.url = str(raw.url)
+        self.status_code = raw.status
+        self.reason = raw.reason
+        self.headers = CaseInsensitiveDict(raw.headers)
+        self.from_cache = getattr(raw, 'from_cache', False)
+        self.encoding = None
+        self._content = content
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b''.join(self.iter_content())
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or ENCODING, 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=2 ** 16):
+        while True:
+            chunk = self.engine.run(self.raw.content.read(chunk_size))
+            if not chunk:
+                break
+            yield chunk
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(
+                f'{self.status_code} {self.reason}: {self.url}',
+                response=self)
+
+    def close(self):
+        self.raw.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncCache:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def clear(self):
+        self.engine.run(self.engine.session.cache.clear())
+
+
+class UncachedSession:
+    # запросы через общий цикл событий и пул соединений мимо кеша
+    def __init__(self, engine):
+        self.engine = engine
+        self.retries = engine.retries
+
+    def request(self, method, url, **kwargs):
+        return self.engine.request(method, url, cached=False, **kwargs)
+
+
+class AsyncSession:
+    # все запросы выполняются в одном цикле событий в фоновом потоке
+    # с общим пулом соединений aiohttp; синхронный интерфейс позволяет
+    # использовать сессию в get_response и get_soup без изменений,
+    # а request_many выполняет группу запросов корутинами, не занимая
+    # поток на каждый запрос
+    def __init__(self, cache_name, backend, pool_size=DEFAULT_POOL_SIZE,
+                 limiter=None, timeout=(None, None), headers=None,
+                 **cache_kwargs):
+        self.pool_size = pool_size
+        self.retries = DEFAULT_RETRIES
+        self.limiter = limiter
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=timeout[0], sock_read=timeout[1])
+        self.headers = headers
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.session, self.plain_session = self.run(self.open(
+            CACHE_BACKENDS[backend](
+                cache_name=f'{cache_name}{ASYNC_CACHE_SUFFIX}',
+                **cache_kwargs),
+            pool_size))
+        self.cache = AsyncCache(self)
+
+    async def open(self, cache, pool_size):
+        connector = aiohttp.TCPConnector(
+            limit=pool_size, limit_per_host=pool_size)
+        options = dict(
+            connector=connector,
+            timeout=self.timeout,
+            headers=self.headers,
+            trace_configs=(
+                [] if self.limiter is None else [self.trace_config()]))
+        return (
+            CachedSession(cache=cache, **options),
+            aiohttp.ClientSession(connector_owner=False, **options))
+
+    def trace_config(self):
+        # хуки трассировки вызываются только для запросов в сеть,
+        # ответы из кеша ограничитель скорости не задерживают
+        async def on_request_start(session, context, params):
+            await self.limiter.wait_async(str(params.url))
+
+        async def on_request_end(session, context, params):
+            self.limiter.feedback(str(params.url), params.response.status)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def send(self, method, url, stream=False, cached=True, **kwargs):
+        # cached=False обходит кеш только для этого запроса,
+        # одновременные запросы других режимов его по-прежнему используют
+        session = self.session if cached else self.plain_session
+        raw = await session.request(method, url, **kwargs)
+        if stream:
+            return raw, None
+        content = await raw.read()
+        raw.release()
+        return raw, content
+
+    def options(self, headers=None, allow_redirects=True, timeout=None):
+        options = dict(headers=headers, allow_redirects=allow_redirects)
+        if timeout is not None:
+            options['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        return options
+
+    def request(self, method, url, headers=None, stream=False,
+                allow_redirects=True, timeout=None, cached=True):
+        try:
+            raw, content = self.run(self.send(
+                method, url, stream, cached,
+                **self.options(headers, allow_redirects, timeout)))
+        except CLIENT_ERRORS as error:
+            raise requests.exceptions.ConnectionError(error)
+        return AsyncResponse(self, raw, content)
+
+    async def send_with_retries(self, method, url, **kwargs):
+        # те же правила повторов, что у utils.send_with_retries,
+        # но ожидание не занимает поток
+        for attempt in range(self.retries + 1):
+            start = perf_counter()
+            try:
+                raw, content = await self.send(method, url, **kwargs)
+            except CLIENT_ERRORS as error:
+                if attempt == self.retries:
+                    raise requests.exceptions.ConnectionError(error)
+                reason, delay = error, backoff_delay(attempt)
+            else:
+                if raw.status not in RETRY_STATUSES or (
+                        attempt == self.retries):
+                    return AsyncResponse(
+                        self, raw, content, perf_counter() - start)
+                reason = raw.status
+                delay = backoff_delay(attempt, raw.headers.get('Retry-After'))
+            METRICS.record_retry()
+            logging.warning(RETRY_MESSAGE.format(
+                url=url, attempt=attempt + 1, delay=delay, reason=reason))
+            await asyncio.sleep(delay)
+
+    async def gather(self, requests_list):
+        # в сети одновременно не больше pool_size запросов, остальные
+        # ждут семафор, а не свободный поток
+        semaphore = asyncio.Semaphore(self.pool_size)
+
+        async def send(method, url, headers):
+            async with semaphore:
+                return await self.send_with_retries(
+                    method, url, **self.options(headers))
+
+        return await asyncio.gather(
+            *(send(*request) for request in requests_list),
+            return_exceptions=True)
+
+    def submit_many(self, requests_list):
+        # запросы (метод, адрес, заголовки) уходят в цикл событий сразу,
+        # результаты — ответы или исключения в исходном порядке —
+        # забираются из возвращённого future
+        return asyncio.run_coroutine_threadsafe(
+            self.gather(list(requests_list)), self.loop)
+
+    def request_many(self, requests_list) -> list:
+        return self.submit_many(requests_list).result()
+
+    def uncached(self):
+        return UncachedSession(self)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    async def close_sessions(self):
+        await self.plain_session.close()
+        await self.session.close()
+
+    def close(self):
+        self.run(self.close_sessions())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,232 @@
+# cache_store.py
+import gzip
+import hashlib
+import sqlite3
+from time import time
+
+import attr
+from requests_cache.backends.base import BaseCache
+from requests_cache.backends.sqlite import SQLiteCache, SQLiteDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_CODEC = 'zstd'
+GZIP_CODEC = 'gzip'
+# время обращения обновляется не чаще раза в минуту,
+# чтобы чтение из кеша не превращалось в запись на диск
+ACCESS_RESOLUTION = 60
+
+
+def gzip_compress(data):
+    return gzip.compress(data, compresslevel=6)
+
+
+def zstd_compress(data):
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+COMPRESSORS = {
+    ZSTD_CODEC: zstd_compress,
+    GZIP_CODEC: gzip_compress,
+}
+DECOMPRESSORS = {
+    ZSTD_CODEC: zstd_decompress,
+    GZIP_CODEC: gzip.decompress,
+}
+
+
+def default_codec():
+    # zstd быстрее и плотнее, gzip есть в стандартной библиотеке
+    return GZIP_CODEC if zstandard is None else ZSTD_CODEC
+
+
+class CompressedResponseDict(SQLiteDict):
+    # тело ответа хранится отдельно от заголовков, сжатым и один раз
+    # на каждое уникальное содержимое (ключ — sha256 тела)
+    def __init__(self, db_path, table_name='responses', max_size=None,
+                 codec=None, **kwargs):
+        self.max_size = max_size
+        self.codec = codec or default_codec()
+        self.bodies_table = f'{table_name}_bodies'
+        self.size_table = f'{table_name}_size'
+        super().__init__(db_path, table_name=table_name, **kwargs)
+
+    def init_db(self):
+        self.close()
+        with self._lock, self.connection(commit=True) as con:
+            con.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table_name} ('
+                'key TEXT PRIMARY KEY, '
+                'value BLOB NOT NULL, '
+                'digest TEXT NOT NULL, '
+                'accessed REAL NOT NULL)')
+            con.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.bodies_table} ('
+                'digest TEXT PRIMARY KEY, '
+                'codec TEXT NOT NULL, '
+                'data BLOB NOT NULL)')
+            con.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.table_name}_accessed '
+                f'ON {self.table_name} (accessed)')
+            con.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.table_name}_digest '
+                f'ON {self.table_name} (digest)')
+            self.init_size(con)
+
+    def init_size(self, con):
+        # общий размер хранится одной строкой и обновляется триггерами
+        # при любой вставке и удалении, поэтому запись в кеш не пересчитывает
+        # его по всем таблицам
+        con.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.size_table} ('
+            'total INTEGER NOT NULL)')
+        con.execute(
+            f'INSERT INTO {self.size_table} SELECT '
+            f'(SELECT IFNULL(SUM(LENGTH(value)), 0) FROM {self.table_name})'
+            f' + (SELECT IFNULL(SUM(LENGTH(data)), 0) '
+            f'FROM {self.bodies_table}) '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {self.size_table})')
+        for table, column in (
+                (self.table_name, 'value'), (self.bodies_table, 'data')):
+            con.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {table}_inserted '
+                f'AFTER INSERT ON {table} BEGIN '
+                f'UPDATE {self.size_table} '
+                f'SET total = total + LENGTH(NEW.{column}); END')
+            con.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {table}_deleted '
+                f'AFTER DELETE ON {table} BEGIN '
+                f'UPDATE {self.size_table} '
+                f'SET total = total - LENGTH(OLD.{column}); END')
+
+    def __getitem__(self, key):
+        with self._lock, self.connection(commit=True) as con:
+            row = con.execute(
+                f'SELECT r.value, b.codec, b.data FROM {self.table_name} r '
+                f'JOIN {self.bodies_table} b USING (digest) WHERE r.key = ?',
+                (key,)).fetchone()
+            if row is not None:
+                now = time()
+                con.execute(
+                    f'UPDATE {self.table_name} SET accessed = ? '
+                    'WHERE key = ? AND accessed < ?',
+                    (now, key, now - ACCESS_RESOLUTION))
+        if row is None:
+            raise KeyError
+        value, codec, data = row
+        response = self.serializer.loads(value)
+        response._content = DECOMPRESSORS[codec](data)
+        response.raw.reset(response._content)
+        return response
+
+    def __setitem__(self, key, response):
+        body = response._content or b''
+        digest = hashlib.sha256(body).hexdigest()
+        value = self.serializer.dumps(attr.evolve(response, content=None))
+        with self._lock, self.connection(commit=True) as con:
+            previous = con.execute(
+                f'SELECT digest FROM {self.table_name} WHERE key = ?',
+                (key,)).fetchone()
+            exists = con.execute(
+                f'SELECT 1 FROM {self.bodies_table} WHERE digest = ?',
+                (digest,)).fetchone()
+            if exists is None:
+                con.execute(
+                    f'INSERT INTO {self.bodies_table} VALUES (?, ?, ?)',
+                    (digest, self.codec, sqlite3.Binary(
+                        COMPRESSORS[self.codec](body))))
+            # REPLACE не вызывает триггер удаления, поэтому прежний
+            # ответ удаляется явно
+            con.execute(
+                f'DELETE FROM {self.table_name} WHERE key = ?', (key,))
+            con.execute(
+                f'INSERT INTO {self.table_name} VALUES (?, ?, ?, ?)',
+                (key, sqlite3.Binary(value), digest, time()))
+            if previous is not None:
+                self.release_body(con, *previous)
+            if self.max_size is not None:
+                self.evict(con, keep=key)
+
+    def stored_size(self, con=None) -> int:
+        if con is None:
+            with self.connection() as con:
+                return self.stored_size(con)
+        return con.execute(
+            f'SELECT total FROM {self.size_table}').fetchone()[0]
+
+    def evict(self, con, keep):
+        # давно не читавшиеся ответы выбираются по индексу accessed, пока
+        # их размера хватает на превышение, и удаляются одним запросом.
+        # Тело, общее с оставшимися ответами, не освобождается, поэтому
+        # после удаления размер проверяется ещё раз
+        excess = self.stored_size(con) - self.max_size
+        while excess > 0:
+            victims, digests, freed = [], set(), 0
+            for key, digest, size, body_size in con.execute(
+                f'SELECT r.key, r.digest, LENGTH(r.value), LENGTH(b.data) '
+                f'FROM {self.table_name} r '
+                f'JOIN {self.bodies_table} b USING (digest) '
+                'WHERE r.key != ? ORDER BY r.accessed', (keep,)
+            ):
+                victims.append(key)
+                freed += size + (0 if digest in digests else body_size)
+                digests.add(digest)
+                if freed >= excess:
+                    break
+            if not victims:
+                return
+            con.executemany(
+                f'DELETE FROM {self.table_name} WHERE key = ?',
+                ((key,) for key in victims))
+            con.executemany(
+                f'DELETE FROM {self.bodies_table} WHERE digest = ? '
+                f'AND NOT EXISTS (SELECT 1 FROM {self.table_name} '
+                'WHERE digest = ?)',
+                ((digest, digest) for digest in digests))
+            excess = self.stored_size(con) - self.max_size
+
+    def release_body(self, con, digest):
+        con.execute(
+            f'DELETE FROM {self.bodies_table} WHERE digest = ? AND NOT EXISTS '
+            f'(SELECT 1 FROM {self.table_name} WHERE digest = ?)',
+            (digest, digest))
+
+    def prune_bodies(self, con):
+        # тело удаляется, когда на него не ссылается ни один ответ
+        con.execute(
+            f'DELETE FROM {self.bodies_table} WHERE digest NOT IN '
+            f'(SELECT digest FROM {self.table_name})')
+
+    def bulk_delete(self, keys=None, values=None):
+        super().bulk_delete(keys, values)
+        with self._lock, self.connection(commit=True) as con:
+            self.prune_bodies(con)
+
+    def clear(self):
+        with self._lock, self.connection(commit=True) as con:
+            con.execute(f'DROP TABLE IF EXISTS {self.bodies_table}')
+            con.execute(f'DROP TABLE IF EXISTS {self.size_table}')
+        super().clear()
+
+
+class CompressedCache(SQLiteCache):
+    # очистка и удаление берутся из SQLiteCache, схема таблицы ответов
+    # своя, поэтому таблицы SQLiteCache не создаются
+    def __init__(self, db_path='http_cache', max_size=None, codec=None,
+                 **kwargs):
+        BaseCache.__init__(self, **kwargs)
+        self.responses = CompressedResponseDict(
+            db_path,
+            table_name='responses',
+            max_size=max_size,
+            codec=codec,
+            **kwargs)
+        self.redirects = SQLiteDict(
+            db_path, table_name='redirects', **kwargs)
@@ -1,22 +1,54 @@
 import argparse
 
 import logging
+from datetime import timedelta
 from logging.handlers import RotatingFileHandler
+from pathlib import Path
 
-from constants import LOG_DIR, PARSER_LOG_NAME, PRETTY_OUTPUT, FILE_OUTPUT
+from constants import (
+    LOG_DIR, PARSER_LOG_NAME, PRETTY_OUTPUT, FILE_OUTPUT, JSONL_OUTPUT,
+    PARQUET_OUTPUT, SQLITE_OUTPUT, DEFAULT_WORKERS, DEFAULT_VERIFY_RATE,
+    DEFAULT_EXTRACT_CACHE_SIZE, DEFAULT_MAX_DEPTH, HTML_SOURCE, API_SOURCE,
+    CROSS_CHECK_SOURCE, DEFAULT_SEARCH_LIMIT,
+    SQLITE_BACKEND, FILESYSTEM_BACKEND, MEMORY_BACKEND, COMPRESSED_BACKEND,
+    HTTP_CACHE_NAME, COMPRESSED_CACHE_SUFFIX,
+    CACHE_EXPIRE_AFTER, URLS_EXPIRE_AFTER, NEVER_EXPIRE, BS4_PARSER,
+    LXML_PARSER,
+    SYNC_ENGINE, ASYNC_ENGINE, DEFAULT_RATE_LIMIT, DEFAULT_RETRIES,
+    DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT,
+    DEFAULT_ACCEPT_ENCODING)
 
 LOG_FORMAT = '"%(asctime)s - [%(levelname)s] - %(message)s"'
 DT_FORMAT = '%d.%m.%Y %H:%M:%S'
-OUTPUT_OPTIONS = (PRETTY_OUTPUT, FILE_OUTPUT)
+OUTPUT_OPTIONS = (
+    PRETTY_OUTPUT, FILE_OUTPUT, JSONL_OUTPUT, PARQUET_OUTPUT, SQLITE_OUTPUT)
+CACHE_BACKENDS = (
+    SQLITE_BACKEND, FILESYSTEM_BACKEND, MEMORY_BACKEND, COMPRESSED_BACKEND)
+MEGABYTE = 2 ** 20
+PARSER_OPTIONS = (BS4_PARSER, LXML_PARSER)
+ENGINE_OPTIONS = (SYNC_ENGINE, ASYNC_ENGINE)
+PEP_SOURCES = (HTML_SOURCE, API_SOURCE, CROSS_CHECK_SOURCE)
 
 
 def configure_argument_parser(available_modes):
     parser = argparse.ArgumentParser(description='Парсер документации Python')
     parser.add_argument(
         'mode',
+        nargs='+',
         choices=available_modes,
         help='Режимы работы парсера'
     )
+    parser.add_argument(
+        '--parallel-modes',
+        action='store_true',
+        help='Одновременное выполнение нескольких режимов'
+    )
+    parser.add_argument(
+        '--watch',
+        type=float,
+        metavar='INTERVAL',
+        help='Повторять режимы каждые INTERVAL секунд и выводить изменения'
+    )
     parser.add_argument(
         '-c',
         '--clear-cache',
@@ -29,6 +61,145 @@ def configure_argument_parser(available_modes):
         choices=OUTPUT_OPTIONS,
         help='Дополнительные способы вывода данных'
     )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help='Количество параллельных загрузок страниц'
+    )
+    parser.add_argument(
+        '-r',
+        '--revalidate',
+        action='store_true',
+        help='Проверка неизменившихся статей PEP условным запросом'
+    )
+    parser.add_argument(
+        '--pep-source',
+        choices=PEP_SOURCES,
+        default=HTML_SOURCE,
+        help='Источник статусов PEP: страницы, JSON API или их сверка'
+    )
+    parser.add_argument(
+        '--crawl-prefix',
+        help='Префикс адресов для режима crawl, с него начинается обход'
+    )
+    parser.add_argument(
+        '--max-depth',
+        type=int,
+        default=DEFAULT_MAX_DEPTH,
+        help='Глубина обхода в режиме crawl'
+    )
+    parser.add_argument(
+        '-q',
+        '--query',
+        help='Запрос для режима search'
+    )
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=DEFAULT_SEARCH_LIMIT,
+        help='Число результатов режима search'
+    )
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='Брать из общей таблицы статусы PEP с однозначным кодом'
+    )
+    parser.add_argument(
+        '--verify-rate',
+        type=float,
+        default=DEFAULT_VERIFY_RATE,
+        help='Доля статей с однозначным кодом, проверяемых загрузкой'
+    )
+    parser.add_argument(
+        '--cache-backend',
+        choices=CACHE_BACKENDS,
+        default=SQLITE_BACKEND,
+        help='Хранилище кеша HTTP-ответов'
+    )
+    parser.add_argument(
+        '--cache-max-size',
+        type=float,
+        metavar='MB',
+        help='Предельный размер кеша compressed, старые ответы вытесняются'
+    )
+    parser.add_argument(
+        '--stale-if-error',
+        action='store_true',
+        help='Использовать устаревший кеш при ошибке обновления'
+    )
+    parser.add_argument(
+        '-p',
+        '--parser',
+        choices=PARSER_OPTIONS,
+        default=BS4_PARSER,
+        help='Движок разбора статей PEP и страниц whats-new'
+    )
+    parser.add_argument(
+        '--extract-cache-size',
+        type=int,
+        default=DEFAULT_EXTRACT_CACHE_SIZE,
+        help='Число сохраняемых результатов разбора страниц, 0 отключает'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Вывод в лог времени фаз и статистики запросов'
+    )
+    parser.add_argument(
+        '--metrics-out',
+        type=Path,
+        help='Файл JSON для сохранения метрик'
+    )
+    parser.add_argument(
+        '-e',
+        '--engine',
+        choices=ENGINE_OPTIONS,
+        default=SYNC_ENGINE,
+        help='HTTP-клиент: requests или aiohttp в одном цикле событий'
+    )
+    parser.add_argument(
+        '--parse-processes',
+        type=int,
+        default=0,
+        help='Количество процессов для разбора страниц (0 - без пула)'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        default=DEFAULT_RATE_LIMIT,
+        help='Максимум запросов в секунду к одному хосту (0 - без ограничения)'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_RETRIES,
+        help='Количество повторов запроса при ответах 429/5xx и ошибках сети'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help='Размер пула соединений к одному хосту'
+    )
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help='Таймаут установки соединения, с'
+    )
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help='Таймаут чтения ответа, с'
+    )
+    parser.add_argument(
+        '--accept-encoding',
+        default=DEFAULT_ACCEPT_ENCODING,
+        help='Значение заголовка Accept-Encoding'
+    )
     return parser
 
 
@@ -43,3 +214,109 @@ def configure_logging():
         level=logging.INFO,
         handlers=(rotating_handler, logging.StreamHandler())
     )
+
+
+def cache_expiration(cli_args) -> dict:
+    # в режиме наблюдения кеш устаревает не позже следующего цикла,
+    # поэтому каждый цикл перепроверяет страницы условными запросами
+    if not getattr(cli_args, 'watch', None):
+        return dict(
+            expire_after=CACHE_EXPIRE_AFTER,
+            urls_expire_after=URLS_EXPIRE_AFTER)
+    interval = timedelta(seconds=cli_args.watch)
+    return dict(
+        expire_after=min(CACHE_EXPIRE_AFTER, interval),
+        urls_expire_after={
+            pattern: (
+                expire_after if expire_after == NEVER_EXPIRE
+                else min(expire_after, interval))
+            for pattern, expire_after in URLS_EXPIRE_AFTER.items()})
+
+
+def cache_backend(cli_args):
+    if cli_args.cache_backend != COMPRESSED_BACKEND:
+        return cli_args.cache_backend
+    from cache_store import CompressedCache
+
+    max_size = getattr(cli_args, 'cache_max_size', None)
+    return CompressedCache(
+        f'{HTTP_CACHE_NAME}{COMPRESSED_CACHE_SUFFIX}',
+        max_size=None if max_size is None else int(max_size * MEGABYTE))
+
+
+def configure_sync_session(cli_args, limiter):
+    # просроченные ответы с ETag/Last-Modified перепроверяются
+    # условным запросом, ответ 304 продлевает срок жизни кеша
+    from requests_cache import CachedSession
+
+    from throttling import ThrottledHTTPAdapter
+
+    session = CachedSession(
+        HTTP_CACHE_NAME,
+        backend=cache_backend(cli_args),
+        stale_if_error=cli_args.stale_if_error,
+        **cache_expiration(cli_args),
+    )
+    # pool_block: при нехватке соединений потоки ждут свободное
+    # keep-alive соединение, а не открывают и выбрасывают лишние
+    adapter = ThrottledHTTPAdapter(
+        limiter,
+        timeout=(cli_args.connect_timeout, cli_args.read_timeout),
+        pool_connections=cli_args.pool_size,
+        pool_maxsize=cli_args.pool_size,
+        pool_block=True)
+    session.headers['Accept-Encoding'] = cli_args.accept_encoding
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def configure_async_session(cli_args, limiter):
+    # aiohttp нужен только асинхронному движку
+    from async_engine import AsyncSession
+
+    return AsyncSession(
+        HTTP_CACHE_NAME,
+        cli_args.cache_backend,
+        pool_size=cli_args.pool_size,
+        limiter=limiter,
+        timeout=(cli_args.connect_timeout, cli_args.read_timeout),
+        headers={'Accept-Encoding': cli_args.accept_encoding},
+        **cache_expiration(cli_args),
+    )
+
+
+def uncached_session(session):
+    # сессия для ответов, которые не должны попадать в кеш, например
+    # архивов: cache_disabled переключает общую сессию для всех потоков,
+    # и одновременные режимы перестали бы пользоваться кешем
+    if hasattr(session, 'uncached'):
+        return session.uncached()
+    import requests
+
+    plain = requests.Session()
+    plain.headers.update(session.headers)
+    # адаптеры общие: тот же пул соединений и ограничение скорости,
+    # поэтому закрывать эту сессию не нужно
+    plain.adapters = session.adapters
+    plain.retries = getattr(session, 'retries', DEFAULT_RETRIES)
+    return plain
+
+
+SESSION_FACTORIES = {
+    SYNC_ENGINE: configure_sync_session,
+    ASYNC_ENGINE: configure_async_session,
+}
+
+
+def configure_session(cli_args):
+    # requests_cache и requests загружаются только при создании сессии,
+    # разбору аргументов и --help они не нужны
+    from throttling import RateLimiter
+
+    session = SESSION_FACTORIES[cli_args.engine](
+        cli_args, RateLimiter(cli_args.rate_limit))
+    session.retries = cli_args.retries
+    if cli_args.clear_cache:
+        session.cache.clear()
+    return session
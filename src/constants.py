@@ -1,21 +1,88 @@
+from datetime import timedelta
 from pathlib import Path
 from urllib.parse import urljoin
 
 # literals
 PRETTY_OUTPUT = 'pretty'
 FILE_OUTPUT = 'file'
+JSONL_OUTPUT = 'jsonl'
+PARQUET_OUTPUT = 'parquet'
+SQLITE_OUTPUT = 'sqlite'
+SQLITE_BACKEND = 'sqlite'
+FILESYSTEM_BACKEND = 'filesystem'
+MEMORY_BACKEND = 'memory'
+COMPRESSED_BACKEND = 'compressed'
+BS4_PARSER = 'bs4'
+LXML_PARSER = 'lxml'
+ENCODING = 'utf-8'
+SYNC_ENGINE = 'sync'
+ASYNC_ENGINE = 'async'
+ALL_MODES = 'all'
+# crawl, index и search обходят весь сайт или требуют запроса,
+# поэтому в all не входят и запускаются только явно
+MODES_IN_ALL = ('whats-new', 'latest-versions', 'download', 'pep')
+HTML_SOURCE = 'html'
+API_SOURCE = 'api'
+CROSS_CHECK_SOURCE = 'cross-check'
+
+# concurrency
+DEFAULT_WORKERS = 8
+DEFAULT_VERIFY_RATE = 0.0
+DEFAULT_EXTRACT_CACHE_SIZE = 10_000
+
+# crawl
+DEFAULT_MAX_DEPTH = 2
+# ожидаемое число страниц, от него зависит размер фильтра Блума
+CRAWL_CAPACITY = 200_000
+CRAWL_BATCH_PER_WORKER = 4
+
+# search
+DEFAULT_SEARCH_LIMIT = 10
+
+# http
+DEFAULT_RATE_LIMIT = 10.0
+DEFAULT_RETRIES = 3
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_ACCEPT_ENCODING = 'gzip, deflate'
+
+# downloads
+DOWNLOAD_CHUNK_SIZE = 2 ** 20
+ETAG_SUFFIX = '.etag'
 
 # file system paths
 BASE_DIR = Path(__file__).parent
 LOG_DIR = BASE_DIR / 'logs'
 PARSER_LOG_NAME = LOG_DIR / 'parser.log'
+PEP_INDEX_NAME = 'pep_index.sqlite3'
+RESULTS_DB_NAME = 'results.sqlite3'
+EXTRACT_CACHE_NAME = 'extract_cache.sqlite3'
+CRAWL_CHECKPOINT_NAME = 'crawl_checkpoint.jsonl'
+SEARCH_INDEX_NAME = 'search_index.sqlite3'
+HTTP_CACHE_NAME = BASE_DIR / 'http_cache'
+ASYNC_CACHE_SUFFIX = '_async'
+COMPRESSED_CACHE_SUFFIX = '_compressed'
 
 # urls
 MAIN_DOC_URL = 'https://docs.python.org/3/'
 PEPS_URL = 'https://peps.python.org/'
+PEPS_API_URL = urljoin(PEPS_URL, 'api/peps.json')
 WHATS_NEW_URL = urljoin(MAIN_DOC_URL, 'whatsnew/')
 DOWNLOADS_URL = urljoin(MAIN_DOC_URL, 'download.html')
 
+# cache policy
+NEVER_EXPIRE = -1
+CACHE_EXPIRE_AFTER = timedelta(days=1)
+# шаблоны проверяются по порядку, к каждому неявно добавляется `**`
+URLS_EXPIRE_AFTER = {
+    urljoin(PEPS_URL, 'pep-*'): timedelta(hours=12),
+    PEPS_URL: timedelta(minutes=15),
+    'docs.python.org/[0-9].[0-9]*/': NEVER_EXPIRE,
+    WHATS_NEW_URL: timedelta(days=7),
+    MAIN_DOC_URL: timedelta(hours=6),
+}
+
 # formatting strings
 DATETIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
 
@@ -32,19 +99,53 @@ EXPECTED_STATUS = {
     'W': ('Withdrawn',),
     '': ('Draft', 'Active'),
 }
+PEP_METADATA_FIELDS = (
+    'Author', 'Sponsor', 'PEP-Delegate', 'Discussions-To', 'Status', 'Type',
+    'Topic', 'Requires', 'Created', 'Python-Version', 'Post-History',
+    'Replaces', 'Superseded-By', 'Resolution',
+)
+PEP_DATE_FORMAT = '%d-%b-%Y'
 
 # info messages
 ARGUMENTS_MESSAGE = 'Аргументы командной строки: {args}'
 FILE_SAVED_AT = 'Файл с результатами был сохранён: {path}'
+METRICS_MESSAGE = 'Метрики режима {mode}: {metrics}'
+WATCH_NO_CHANGES = 'Режим {mode}: изменений нет'
+WATCH_ROW_REMOVED = 'Режим {mode}: строка {key} больше не встречается'
+WATCH_STOPPED = 'Наблюдение остановлено пользователем'
+RETRY_MESSAGE = (
+    'Повтор запроса {url} (попытка {attempt}) через {delay:.1f} с: {reason}')
+THROTTLING_MESSAGE = (
+    'Режим {mode}: ожиданий ограничителя скорости {throttled} '
+    '({throttle_time:.1f} с), повторов запросов {retries}')
 DOWNLOAD_SAVED_AT = 'Архив был загружен и сохранён: {path}'
+DOWNLOAD_RESUMED = 'Загрузка архива была продолжена и завершена: {path}'
+DOWNLOAD_SKIPPED = 'Архив не изменился, загрузка пропущена: {path}'
+DOWNLOAD_ERROR = 'Ошибка при загрузке архива {url}: {error}'
 UNEXPECTED_STATUS = (
     'Не совпадают статусы для статьи PEP{PEP}. '
     'Ожидаемые: {expected}, '
     'действительный: {actual}')
 MISSING_DATA = 'В таблице не найден {datapoint} для статьи {PEP}'
 MISSING_STATUS = 'Не найден актуальный статус в статье {PEP}'
+ARTICLE_ERROR = 'Ошибка при обработке статьи {PEP}: {error}'
+WHATS_NEW_ERROR = 'Ошибка при обработке страницы {url}: {error}'
+CRAWL_ERROR = 'Ошибка при обходе страницы {url}: {error}'
+SEARCH_QUERY_MISSING = 'Для режима search укажите запрос: -q "запрос"'
+SEARCH_INDEX_MISSING = (
+    'Индекс {path} не найден, сначала выполните режим index'
+)
+INDEX_CACHE_UNAVAILABLE = (
+    'Режим index строит индекс по кешу синхронного движка (--engine sync)'
+)
+CRAWL_RESUMED = (
+    'Обход продолжен с контрольной точки: посещено {visited}, '
+    'в очереди {queued}'
+)
 
 # exception messages
+PYARROW_MISSING = (
+    'Для вывода в Parquet установите пакет pyarrow: pip install pyarrow')
 BASE_EXCEPTION_MESSAGE = (
     'Произошла ошибка при исполнении программы '
     'в режиме {mode}: {error}')
@@ -0,0 +1,186 @@
+# crawler.py
+import hashlib
+import json
+import math
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import chain
+from pathlib import PurePosixPath
+from urllib.parse import urldefrag, urlsplit, urlunsplit
+
+# страницы с таким расширением не разбираются: архивы, картинки и т.п.
+HTML_SUFFIXES = ('', '.html', '.htm')
+INDEX_PAGE = 'index.html'
+# новые хеши копятся в множестве и сливаются в отсортированный массив
+# группами, чтобы не сдвигать массив при каждой вставке
+MERGE_SIZE = 4096
+
+
+def normalize_url(url) -> str:
+    # одна страница — один ключ: без фрагмента, хост в нижнем регистре,
+    # каталог и его index.html совпадают
+    scheme, netloc, path, query, _ = urlsplit(urldefrag(url)[0])
+    if path.endswith('/' + INDEX_PAGE):
+        path = path[:-len(INDEX_PAGE)]
+    return urlunsplit((scheme.lower(), netloc.lower(), path or '/', query, ''))
+
+
+def is_page(url) -> bool:
+    return PurePosixPath(urlsplit(url).path).suffix in HTML_SUFFIXES
+
+
+def url_hash(url) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(url.encode(), digest_size=8).digest(), 'big')
+
+
+class BloomFilter:
+    # размер битового массива не зависит от числа добавленных адресов
+    def __init__(self, capacity, error_rate=0.001, bits=None):
+        self.size = max(8, int(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits or bytearray((self.size + 7) // 8)
+
+    def positions(self, value):
+        # двойное хеширование: k позиций из двух половин одного дайджеста
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        for number in range(self.hashes):
+            yield (first + number * second) % self.size
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position // 8] |= 1 << position % 8
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position // 8] & 1 << position % 8
+            for position in self.positions(value))
+
+
+class VisitedSet:
+    # фильтр Блума отвечает «точно новый» без обращения к хешам;
+    # ложные срабатывания фильтра проверяются по 8-байтовым хешам
+    # адресов в отсортированном array('Q'): 8 байт на адрес вместо
+    # объекта int в множестве, строки адресов не хранятся
+    def __init__(self, capacity):
+        self.bloom = BloomFilter(capacity)
+        self.hashes = array('Q')
+        self.recent = set()
+
+    def __contains__(self, key):
+        if key in self.recent:
+            return True
+        position = bisect_left(self.hashes, key)
+        return (
+            position < len(self.hashes) and self.hashes[position] == key)
+
+    def add(self, url) -> bool:
+        # возвращает False, если адрес уже встречался
+        url = normalize_url(url)
+        key = url_hash(url)
+        if url in self.bloom and key in self:
+            return False
+        self.bloom.add(url)
+        self.recent.add(key)
+        if len(self.recent) >= MERGE_SIZE:
+            self.hashes = array(
+                'Q', sorted(chain(self.hashes, self.recent)))
+            self.recent.clear()
+        return True
+
+    def __len__(self):
+        return len(self.hashes) + len(self.recent)
+
+
+class CrawlState:
+    # очередь обхода в ширину и посещённые адреса. Контрольная точка —
+    # журнал JSON Lines: после каждой группы страниц дописывается строка
+    # с добавленными в очередь адресами и числом взятых из неё, поэтому
+    # запись не растёт с размером обхода. Посещённые адреса и очередь
+    # восстанавливаются повтором журнала
+    def __init__(self, start, prefix, max_depth, capacity):
+        self.settings = dict(
+            start=start, prefix=prefix, max_depth=max_depth,
+            capacity=capacity)
+        self.visited = VisitedSet(capacity)
+        self.frontier = deque()
+        self.popped = 0
+        self.pushed = []
+        self.saved = False
+        self.push(start, 0)
+
+    def push(self, url, depth) -> None:
+        url = urldefrag(url)[0]
+        if (depth > self.settings['max_depth']
+                or not url.startswith(self.settings['prefix'])
+                or not is_page(url)):
+            return
+        if self.visited.add(url):
+            self.frontier.append((url, depth))
+            self.pushed.append((url, depth))
+
+    def pop_batch(self, size) -> list:
+        batch = [
+            self.frontier.popleft()
+            for _ in range(min(size, len(self.frontier)))]
+        self.popped += len(batch)
+        return batch
+
+    def save(self, path) -> None:
+        # журнал другого обхода перезаписывается при первом сохранении
+        with path.open('a' if self.saved else 'w') as checkpoint:
+            if not self.saved:
+                checkpoint.write(json.dumps(self.settings) + '\n')
+            checkpoint.write(json.dumps(dict(
+                pushed=self.pushed, popped=self.popped)) + '\n')
+        self.pushed = []
+        self.saved = True
+
+    def replay(self, entries) -> None:
+        self.visited = VisitedSet(self.settings['capacity'])
+        self.frontier.clear()
+        for entry in entries:
+            for url, depth in entry['pushed']:
+                self.visited.add(url)
+                self.frontier.append((url, depth))
+            while self.popped < entry['popped']:
+                self.frontier.popleft()
+                self.popped += 1
+        self.pushed = []
+        self.saved = True
+
+    @classmethod
+    def load(cls, path, start, prefix, max_depth, capacity):
+        # контрольная точка другого обхода не используется
+        state = cls(start, prefix, max_depth, capacity)
+        if not path.exists():
+            return state, False
+        with path.open('r+') as checkpoint:
+            entries = checkpoint_entries(checkpoint)
+            if next(entries, None) != state.settings:
+                return state, False
+            state.replay(entries)
+        return state, True
+
+
+def checkpoint_entries(checkpoint):
+    # строка, дописанная не до конца при обрыве, отрезается, чтобы
+    # следующие строки журнала не оказались после неё
+    while True:
+        position = checkpoint.tell()
+        line = checkpoint.readline()
+        if not line:
+            return
+        try:
+            if not line.endswith('\n'):
+                raise ValueError
+            entry = json.loads(line)
+        except ValueError:
+            checkpoint.seek(position)
+            checkpoint.truncate()
+            return
+        yield entry
@@ -0,0 +1,89 @@
+# extract_cache.py
+import hashlib
+import inspect
+import pickle
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from time import time
+
+# время последнего чтения обновляется не чаще раза в минуту: для
+# вытеснения этого достаточно, а повторные чтения ничего не записывают
+ACCESS_RESOLUTION = 60
+
+
+@lru_cache(maxsize=None)
+def module_version(path) -> str:
+    # версия извлекателя — хеш исходника его модуля: любая правка
+    # модуля делает прежние результаты недействительными
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:16]
+
+
+def extractor_key(extractor, content) -> tuple:
+    return (
+        f'{extractor.__module__}.{extractor.__qualname__}',
+        module_version(inspect.getfile(extractor)),
+        hashlib.sha256(content).hexdigest())
+
+
+class ExtractCache:
+    # результаты извлечения по (имя, версия извлекателя, хеш тела),
+    # при переполнении вытесняются давно не читавшиеся записи
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS extracts ('
+                'extractor TEXT NOT NULL, '
+                'version TEXT NOT NULL, '
+                'digest TEXT NOT NULL, '
+                'value BLOB NOT NULL, '
+                'accessed REAL NOT NULL, '
+                'PRIMARY KEY (extractor, version, digest))')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS extracts_accessed '
+                'ON extracts (accessed)')
+
+    def get(self, key):
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                'SELECT value FROM extracts '
+                'WHERE extractor = ? AND version = ? AND digest = ?',
+                key).fetchone()
+            if row is not None:
+                now = time()
+                self.connection.execute(
+                    'UPDATE extracts SET accessed = ? '
+                    'WHERE extractor = ? AND version = ? AND digest = ? '
+                    'AND accessed < ?',
+                    (now, *key, now - ACCESS_RESOLUTION))
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def save(self, key, value) -> None:
+        with self.lock, self.connection:
+            # записи прежних версий того же извлекателя больше не нужны
+            self.connection.execute(
+                'DELETE FROM extracts WHERE extractor = ? AND version != ?',
+                key[:2])
+            self.connection.execute(
+                'INSERT OR REPLACE INTO extracts VALUES (?, ?, ?, ?, ?)',
+                (*key, pickle.dumps(value), time()))
+            self.connection.execute(
+                'DELETE FROM extracts WHERE rowid IN ('
+                'SELECT rowid FROM extracts ORDER BY accessed DESC '
+                'LIMIT -1 OFFSET ?)',
+                (self.max_entries,))
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
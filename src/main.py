@@ -1,105 +1,195 @@
 # main.py
+import json
 import logging
 import re
+from argparse import Namespace
 from collections import Counter
-from typing import List, Iterator
+from datetime import date, datetime
+from http import HTTPStatus
+from itertools import count, groupby
+from operator import attrgetter
+from random import random
+from time import perf_counter, sleep, time
+from typing import Iterator, Optional
 from urllib.parse import urljoin
 
-from bs4 import SoupStrainer
-from requests_cache import CachedSession
-from tqdm import tqdm
-
-from configs import configure_argument_parser, configure_logging
+from configs import (
+    configure_argument_parser, configure_logging, configure_session,
+    uncached_session)
 from constants import (
-    BASE_DIR, DOWNLOADS_URL, MAIN_DOC_URL, PEPS_URL,
-    EXPECTED_STATUS, UNEXPECTED_STATUS, MISSING_DATA,
+    BASE_DIR, DOWNLOADS_URL, MAIN_DOC_URL, PEPS_URL, PEPS_API_URL,
+    EXPECTED_STATUS, UNEXPECTED_STATUS, MISSING_DATA, PEP_METADATA_FIELDS,
+    PEP_DATE_FORMAT, CRAWL_CHECKPOINT_NAME, CRAWL_CAPACITY,
+    CRAWL_BATCH_PER_WORKER, CRAWL_ERROR, CRAWL_RESUMED, DEFAULT_MAX_DEPTH,
+    SEARCH_INDEX_NAME, SEARCH_INDEX_MISSING, SEARCH_QUERY_MISSING,
+    DEFAULT_SEARCH_LIMIT, INDEX_CACHE_UNAVAILABLE,
     DOWNLOAD_SAVED_AT, ARGUMENTS_MESSAGE, WHATS_NEW_URL,
-    MISSING_STATUS, BASE_EXCEPTION_MESSAGE)
+    MISSING_STATUS, BASE_EXCEPTION_MESSAGE, ARTICLE_ERROR, DEFAULT_WORKERS,
+    DEFAULT_VERIFY_RATE, HTML_SOURCE, API_SOURCE, CROSS_CHECK_SOURCE,
+    WHATS_NEW_ERROR, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_SKIPPED, DOWNLOAD_RESUMED,
+    DOWNLOAD_ERROR, ETAG_SUFFIX, PEP_INDEX_NAME, EXTRACT_CACHE_NAME,
+    BS4_PARSER,
+    METRICS_MESSAGE, FILE_SAVED_AT, THROTTLING_MESSAGE, ALL_MODES,
+    MODES_IN_ALL, WATCH_NO_CHANGES, WATCH_ROW_REMOVED, WATCH_STOPPED)
+from crawler import CrawlState, normalize_url
+from metrics import (
+    METRICS, OTHER_PHASE, OUTPUT_PHASE, PARSE_PHASE, timed_rows,
+    write_metrics)
 from outputs import control_output
-from utils import get_soup, ParserStatusMissingException
+from pep_index import PepIndex, PepRecord
+from search_index import SearchIndex
+from utils import (
+    extract_fields, extract_page, extract_section, extract_text,
+    extraction_cache, get_response, get_soup, iter_extracted,
+    iter_table_rows, map_concurrently, map_fetched, parse_processes,
+    run_extractor, Fetch, ParserStatusMissingException, TableRow)
+
+
+def progress(iterable, **kwargs):
+    # tqdm загружается только режимами, которые показывают прогресс
+    from tqdm import tqdm
 
-PEP_TABLE_STRAINER = SoupStrainer('table')
-PEP_ARTICLE_STRAINER = SoupStrainer('dl')
+    return tqdm(iterable, **kwargs)
 
 
-def whats_new(session) -> List[tuple]:
-    def scrape(session, url_suffix):
-        link = urljoin(WHATS_NEW_URL, url_suffix)
-        section = get_soup(session, link).section
-        return (link,
-                section.h1.text.rstrip('¶'),
-                section.dl.text.replace('\n', ' '))
+def whats_new(session, cli_args=None) -> Iterator[tuple]:
+    def scrape(url_suffix, response, fetch):
+        # сетевое ожидание одних страниц перекрывается разбором других
+        return (fetch.url, *extract_section(
+            response.content, getattr(cli_args, 'parser', BS4_PARSER)))
     log_messages = []
-    results = [('Ссылка на статью', 'Заголовок', 'Редактор, Автор')]
-    for li in tqdm(
-        get_soup(session, WHATS_NEW_URL).select(
-            '#what-s-new-in-python div.toctree-wrapper li.toctree-l1')):
-        try:
-            results.append(scrape(session, li.a['href']))
-        except Exception as exception:
-            log_messages.append(exception.format(url=li.a['href']))
+    yield ('Ссылка на статью', 'Заголовок', 'Редактор, Автор')
+    url_suffixes = [
+        li.a['href'] for li in get_soup(session, WHATS_NEW_URL).select(
+            '#what-s-new-in-python div.toctree-wrapper li.toctree-l1')]
+    for url_suffix, row, exception in progress(
+        map_fetched(
+            session,
+            lambda url_suffix: Fetch(urljoin(WHATS_NEW_URL, url_suffix)),
+            scrape,
+            url_suffixes,
+            getattr(cli_args, 'workers', DEFAULT_WORKERS)),
+        total=len(url_suffixes)
+    ):
+        if exception is not None:
+            log_messages.append(WHATS_NEW_ERROR.format(
+                url=urljoin(WHATS_NEW_URL, url_suffix), error=exception))
+            continue
+        yield row
     for message in log_messages:
         logging.info(message)
-    return results
 
 
-def latest_versions(session) -> List[tuple]:
-    results = [('Ссылка на документацию', 'Версия', 'Статус')]
+def latest_versions(session, cli_args=None) -> Iterator[tuple]:
+    yield ('Ссылка на документацию', 'Версия', 'Статус')
     for ul in get_soup(session, MAIN_DOC_URL).find(
         'div', class_='sphinxsidebarwrapper'
     )('ul'):
         if 'All versions' in ul.text:
-            for tag in tqdm(ul('a')):
+            for tag in progress(ul('a')):
                 match = re.search(
                     r'Python (\d\.\d+) \((.*)\)', tag.text)
                 if match:
                     version, status = match.groups()
-                    results.append((tag['href'], version, status))
+                    yield (tag['href'], version, status)
             break
-    return results
 
 
-def download(session) -> None:
+def download_archive(session, url, f_name) -> str:
+    etag_file = f_name.with_name(f_name.name + ETAG_SUFFIX)
+    head = get_response(session, url, method='HEAD', allow_redirects=True)
+    remote_size = int(head.headers.get('Content-Length', -1))
+    etag = head.headers.get('ETag')
+    local_size = f_name.stat().st_size if f_name.exists() else 0
+    same_archive = etag is not None and etag_file.exists() and (
+        etag_file.read_text() == etag)
+    if same_archive and local_size == remote_size:
+        return DOWNLOAD_SKIPPED.format(path=f_name)
+    headers = {}
+    if same_archive and 0 < local_size < remote_size:
+        headers = {'Range': f'bytes={local_size}-', 'If-Range': etag}
+    with get_response(session, url, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        resumed = response.status_code == HTTPStatus.PARTIAL_CONTENT
+        # ETag записывается до данных, чтобы прерванную загрузку
+        # можно было продолжить при следующем запуске
+        if etag is None:
+            etag_file.unlink(missing_ok=True)
+        else:
+            etag_file.write_text(etag)
+        with open(f_name, 'ab' if resumed else 'wb') as file:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+    return (DOWNLOAD_RESUMED if resumed else DOWNLOAD_SAVED_AT).format(
+        path=f_name)
+
+
+def download(session, cli_args=None) -> None:
     # константа определяется здесь, чтобы успокоился pytest
     DOWNLOADS_DIR = BASE_DIR / 'downloads'
     DOWNLOADS_DIR.mkdir(exist_ok=True)
-    for link in tqdm(
-        get_soup(
+    urls = [
+        urljoin(DOWNLOADS_URL, link['href']) for link in get_soup(
             session,
-            DOWNLOADS_URL).body.select('table.docutils a[href$=".zip"]')):
-        url = urljoin(DOWNLOADS_URL, link['href'])
-        f_name = DOWNLOADS_DIR / url.split('/')[-1]
-        with open(f_name, 'wb') as file:
-            file.write(session.get(url).content)
-        logging.info(DOWNLOAD_SAVED_AT.format(path=f_name))
+            DOWNLOADS_URL).body.select('table.docutils a[href$=".zip"]')]
+
+    # архивы не должны попадать в кеш, а общая сессия остаётся
+    # кешируемой для режимов, выполняемых одновременно
+    archive_session = uncached_session(session)
 
+    def save(url):
+        return download_archive(
+            archive_session, url, DOWNLOADS_DIR / url.split('/')[-1])
 
-def scrape_table(session, scrape_article) -> Iterator[str]:
-    for num, table in enumerate(get_soup(
-        session, PEPS_URL, PEP_TABLE_STRAINER)('table'), 1
+    for url, (message, exception) in progress(
+        zip(urls, map_concurrently(
+            save,
+            urls,
+            getattr(cli_args, 'workers', DEFAULT_WORKERS))),
+        total=len(urls)
     ):
+        if exception is not None:
+            message = DOWNLOAD_ERROR.format(url=url, error=exception)
+        logging.info(message)
+
+
+def rows_with_status(rows, log_messages) -> Iterator[TableRow]:
+    for row in rows:
+        if row.status is None:
+            log_messages.append(MISSING_DATA.format(
+                PEP=row.title,
+                datapoint='статус'))
+            continue
+        yield row
+
+
+def scrape_table(session, plan_article, finish_article,
+                 workers=DEFAULT_WORKERS) -> Iterator[str]:
+    table_rows = iter_extracted(
+        iter_table_rows, get_response(session, PEPS_URL).content)
+    for num, rows in groupby(table_rows, key=attrgetter('table')):
         log_messages = []
-        for row in tqdm(table('tr'), desc=f'Processing table {num}'):
-            status_tag, link_tag = row.abbr, row.a
-            if not link_tag:
-                continue
-            url = link_tag['href']
-            if not status_tag:
-                log_messages.append(MISSING_DATA.format(
-                    PEP=link_tag.text,
-                    datapoint='статус'))
+        # строки забираются из разбора по мере освобождения окна пула
+        for row, actual_status, exception in progress(
+            map_fetched(
+                session,
+                plan_article,
+                finish_article,
+                rows_with_status(rows, log_messages),
+                workers),
+            desc=f'Processing table {num}'
+        ):
+            if isinstance(exception, ParserStatusMissingException):
+                log_messages.append(MISSING_STATUS.format(PEP=row.href))
                 continue
-            expected_status = EXPECTED_STATUS[status_tag.text[1:]]
-            try:
-                actual_status = scrape_article(url)
-            except ParserStatusMissingException:
+            if exception is not None:
                 log_messages.append(
-                    MISSING_STATUS.format(PEP=url))
-            except Exception as exception:
-                log_messages.append(exception.format(PEP=url))
+                    ARTICLE_ERROR.format(PEP=row.href, error=exception))
+                continue
+            expected_status = EXPECTED_STATUS[row.status[1:]]
             if actual_status not in expected_status:
                 log_messages.append(UNEXPECTED_STATUS.format(
-                    PEP=link_tag['href'],
+                    PEP=row.href,
                     expected=expected_status,
                     actual=actual_status))
             yield actual_status
@@ -107,46 +197,459 @@ def scrape_table(session, scrape_article) -> Iterator[str]:
             logging.info(message)
 
 
-def pep(session) -> List[tuple]:
-    def scrape_article_for_status(url) -> str:
-        soup = get_soup(session, urljoin(PEPS_URL, url), PEP_ARTICLE_STRAINER)
-        for tag in soup.dl('dt'):
-            if tag.text == "Status:":
-                return tag.find_next_sibling().text
-        else:
-            raise ParserStatusMissingException
+def conditional_headers(record: PepRecord) -> dict:
+    headers = {}
+    if record.etag:
+        headers['If-None-Match'] = record.etag
+    if record.last_modified:
+        headers['If-Modified-Since'] = record.last_modified
+    return headers
+
+
+def article_fetch(url, record=None) -> Fetch:
+    # из статьи за один разбор извлекаются все поля заголовка, поэтому
+    # режимы pep и pep-metadata загружают каждую статью один раз.
+    # Записи индекса без полей перепроверять бесполезно: в ответе 304
+    # полей нет
+    if record is None or record.fields is None:
+        return Fetch(urljoin(PEPS_URL, url), {})
+    return Fetch(urljoin(PEPS_URL, url), conditional_headers(record), record)
+
+
+def article_record(index, url, table_status, response, parser=BS4_PARSER,
+                   record=None) -> PepRecord:
+    # record — запись, перепроверяемая условным запросом, см. article_fetch
+    if record is not None and (
+            response.status_code == HTTPStatus.NOT_MODIFIED):
+        record = record._replace(fetched_at=time())
+        index.save(record)
+        return record
+    fields = extract_fields(response.content, parser)
+    if 'Status' not in fields:
+        raise ParserStatusMissingException
+    record = PepRecord(
+        url,
+        table_status,
+        fields['Status'],
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified'),
+        time(),
+        fields)
+    index.save(record)
+    return record
+
 
-    counter = Counter(scrape_table(session, scrape_article_for_status))
-    return [('Статус', 'Количество'),
-            *list(counter.items()),
-            ('Все PEP', sum(counter.values()))]
+def trusted_status(table_status) -> Optional[str]:
+    # код из таблицы однозначен, если ему соответствует один статус
+    expected_status = EXPECTED_STATUS.get(table_status[1:], ())
+    return expected_status[0] if len(expected_status) == 1 else None
+
+
+def api_statuses(session) -> dict:
+    # peps.json: {"8": {"number": 8, "status": "Active", "url": ...}, ...}
+    response = get_response(session, PEPS_API_URL)
+    with METRICS.timer(PARSE_PHASE):
+        peps = response.json()
+    return {pep['url']: pep['status'] for pep in peps.values()}
+
+
+def pep(session, cli_args=None) -> Iterator[tuple]:
+    # константа определяется здесь, чтобы успокоился pytest
+    PEP_INDEX_PATH = BASE_DIR / PEP_INDEX_NAME
+    revalidate = getattr(cli_args, 'revalidate', False)
+    parser = getattr(cli_args, 'parser', BS4_PARSER)
+    fast = getattr(cli_args, 'fast', False)
+    verify_rate = getattr(cli_args, 'verify_rate', DEFAULT_VERIFY_RATE)
+    source = getattr(cli_args, 'pep_source', HTML_SOURCE)
+
+    def plan_status(row):
+        # статьи, которых нет в API, проверяются по странице
+        status = statuses.get(urljoin(PEPS_URL, row.href))
+        if status is not None:
+            return status
+        record = index.get(row.href)
+        unchanged = (
+            record is not None and record.table_status == row.status)
+        if unchanged and not revalidate:
+            return record.article_status
+        # в быстром режиме загружаются только статьи с неоднозначным
+        # кодом и случайная доля verify_rate остальных для проверки
+        status = trusted_status(row.status) if fast else None
+        if status is not None and random() >= verify_rate:
+            return status
+        return article_fetch(row.href, record if unchanged else None)
+
+    def finish_status(row, response, fetch) -> str:
+        return article_record(
+            index, row.href, row.status, response, parser,
+            fetch.context).article_status
+
+    if source == API_SOURCE:
+        counter = Counter(api_statuses(session).values())
+    else:
+        # при сверке статусы API сравниваются с кодами таблицы так же,
+        # как статусы статей, и расхождения попадают в UNEXPECTED_STATUS
+        statuses = (
+            api_statuses(session) if source == CROSS_CHECK_SOURCE else {})
+        # счётчик требует всех статусов, но каждая обработанная статья
+        # сразу сохраняется в индекс и не загружается повторно после сбоя
+        with PepIndex(PEP_INDEX_PATH) as index:
+            counter = Counter(scrape_table(
+                session,
+                plan_status,
+                finish_status,
+                getattr(cli_args, 'workers', DEFAULT_WORKERS)))
+    yield ('Статус', 'Количество')
+    yield from counter.items()
+    yield ('Все PEP', sum(counter.values()))
+
+
+def pep_number(href) -> Optional[int]:
+    match = re.search(r'pep-(\d+)', href)
+    return int(match.group(1)) if match else None
+
+
+def pep_date(value) -> Optional[date]:
+    # даты в заголовках PEP записываются как 13-Jul-2000
+    try:
+        return datetime.strptime(value.split()[0], PEP_DATE_FORMAT).date()
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+PEP_FIELD_TYPES = {
+    'Created': pep_date,
+}
+
+
+def metadata_row(row: TableRow, fields: dict) -> tuple:
+    return (
+        pep_number(row.href),
+        row.title,
+        urljoin(PEPS_URL, row.href),
+        *(
+            PEP_FIELD_TYPES.get(field, str)(fields[field])
+            if field in fields else None
+            for field in PEP_METADATA_FIELDS))
+
+
+def unique_rows(rows) -> Iterator[TableRow]:
+    # статья встречается в нескольких таблицах общей страницы
+    seen = set()
+    for row in rows:
+        if row.href not in seen:
+            seen.add(row.href)
+            yield row
+
+
+def pep_metadata(session, cli_args=None) -> Iterator[tuple]:
+    # константа определяется здесь, чтобы успокоился pytest
+    PEP_INDEX_PATH = BASE_DIR / PEP_INDEX_NAME
+    revalidate = getattr(cli_args, 'revalidate', False)
+    parser = getattr(cli_args, 'parser', BS4_PARSER)
+
+    def plan_metadata(row):
+        # поля, сохранённые режимом pep, используются без загрузки
+        record = index.get(row.href)
+        unchanged = (
+            record is not None and record.table_status == row.status)
+        if unchanged and not revalidate and record.fields is not None:
+            return metadata_row(row, record.fields)
+        return article_fetch(row.href, record if unchanged else None)
+
+    def finish_metadata(row, response, fetch) -> tuple:
+        return metadata_row(row, article_record(
+            index, row.href, row.status, response, parser,
+            fetch.context).fields)
+
+    log_messages = []
+    yield ('PEP', 'Title', 'URL', *PEP_METADATA_FIELDS)
+    with PepIndex(PEP_INDEX_PATH) as index:
+        rows = rows_with_status(unique_rows(iter_extracted(
+            iter_table_rows, get_response(session, PEPS_URL).content
+        )), log_messages)
+        for row, metadata, exception in progress(
+            map_fetched(
+                session,
+                plan_metadata,
+                finish_metadata,
+                rows,
+                getattr(cli_args, 'workers', DEFAULT_WORKERS)),
+            desc='Processing PEP metadata'
+        ):
+            if isinstance(exception, ParserStatusMissingException):
+                log_messages.append(MISSING_STATUS.format(PEP=row.href))
+            elif exception is not None:
+                log_messages.append(
+                    ARTICLE_ERROR.format(PEP=row.href, error=exception))
+            else:
+                yield metadata
+    for message in log_messages:
+        logging.info(message)
+
+
+def crawl(session, cli_args=None) -> Iterator[tuple]:
+    # константа определяется здесь, чтобы успокоился pytest
+    CRAWL_CHECKPOINT_PATH = BASE_DIR / CRAWL_CHECKPOINT_NAME
+    prefix = getattr(cli_args, 'crawl_prefix', None) or MAIN_DOC_URL
+    workers = getattr(cli_args, 'workers', DEFAULT_WORKERS)
+    state, resumed = CrawlState.load(
+        CRAWL_CHECKPOINT_PATH,
+        prefix,
+        prefix,
+        getattr(cli_args, 'max_depth', DEFAULT_MAX_DEPTH),
+        CRAWL_CAPACITY)
+    if resumed:
+        logging.info(CRAWL_RESUMED.format(
+            visited=len(state.visited), queued=len(state.frontier)))
+
+    def visit(item, response, fetch) -> tuple:
+        response.raise_for_status()
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return None, []
+        title, links = run_extractor(extract_page, response.content)
+        return title, [urljoin(response.url, link) for link in links]
+
+    def crawled() -> Iterator[tuple]:
+        # очередь обрабатывается группами; контрольная точка пишется
+        # после группы, поэтому прерванная группа повторяется целиком
+        while state.frontier:
+            batch = state.pop_batch(workers * CRAWL_BATCH_PER_WORKER)
+            for (url, depth), page, exception in map_fetched(
+                session,
+                lambda item: Fetch(item[0]),
+                visit,
+                batch,
+                workers
+            ):
+                if exception is not None:
+                    logging.info(CRAWL_ERROR.format(url=url, error=exception))
+                    continue
+                title, links = page
+                for link in links:
+                    state.push(link, depth + 1)
+                yield (url, depth, title)
+            state.save(CRAWL_CHECKPOINT_PATH)
+
+    yield ('Ссылка', 'Глубина', 'Заголовок')
+    yield from progress(crawled(), desc='Crawling')
+    CRAWL_CHECKPOINT_PATH.unlink(missing_ok=True)
+
+
+def cached_pages(session) -> Iterator:
+    # страницы, уже загруженные другими режимами: whats-new, статьи PEP,
+    # документация из режима crawl
+    if not hasattr(session.cache, 'filter'):
+        raise RuntimeError(INDEX_CACHE_UNAVAILABLE)
+    seen = set()
+    for response in session.cache.filter(expired=True):
+        url = normalize_url(response.url)
+        if (response.request.method != 'GET'
+                or response.status_code != HTTPStatus.OK
+                or 'html' not in response.headers.get('Content-Type', '')
+                or url in seen):
+            continue
+        seen.add(url)
+        yield response
+
+
+def build_index(session, cli_args=None) -> Iterator[tuple]:
+    # константа определяется здесь, чтобы успокоился pytest
+    SEARCH_INDEX_PATH = BASE_DIR / SEARCH_INDEX_NAME
+
+    def documents():
+        for response in cached_pages(session):
+            title, text = run_extractor(
+                extract_text, response.content, memoize=False)
+            yield response.url, title, text
+
+    with SearchIndex(SEARCH_INDEX_PATH) as search_index:
+        pages, terms = search_index.build(
+            progress(documents(), desc='Indexing'))
+    yield ('Страниц', 'Терминов')
+    yield (pages, terms)
+
+
+def search(session, cli_args=None) -> Optional[list]:
+    # запрос обслуживается только локальным индексом, без сети
+    SEARCH_INDEX_PATH = BASE_DIR / SEARCH_INDEX_NAME
+    query = getattr(cli_args, 'query', None)
+    if not query:
+        logging.warning(SEARCH_QUERY_MISSING)
+        return None
+    if not SEARCH_INDEX_PATH.exists():
+        raise FileNotFoundError(
+            SEARCH_INDEX_MISSING.format(path=SEARCH_INDEX_PATH))
+    with SearchIndex(SEARCH_INDEX_PATH) as search_index:
+        return [
+            ('Ссылка', 'Заголовок', 'Оценка'),
+            *search_index.search(
+                query, getattr(cli_args, 'limit', DEFAULT_SEARCH_LIMIT))]
 
 
 MODE_TO_FUNCTION = {
     'whats-new': whats_new,
     'latest-versions': latest_versions,
     'download': download,
-    'pep': pep
+    'pep': pep,
+    'pep-metadata': pep_metadata,
+    'crawl': crawl,
+    'index': build_index,
+    'search': search,
 }
 
 
+def report_metrics(metrics_by_mode, cli_args) -> None:
+    for mode, summary in metrics_by_mode.items():
+        logging.info(THROTTLING_MESSAGE.format(mode=mode, **summary))
+    if cli_args.profile:
+        for mode, summary in metrics_by_mode.items():
+            logging.info(METRICS_MESSAGE.format(
+                mode=mode,
+                metrics=json.dumps(summary, ensure_ascii=False)))
+    if cli_args.metrics_out is not None:
+        write_metrics(cli_args.metrics_out, metrics_by_mode)
+        logging.info(FILE_SAVED_AT.format(path=cli_args.metrics_out))
+
+
+def selected_modes(requested_modes) -> list:
+    # с all сначала выполняются MODES_IN_ALL, затем остальные указанные
+    # режимы; повторно указанный режим выполняется один раз
+    if ALL_MODES in requested_modes:
+        requested_modes = [
+            *MODES_IN_ALL,
+            *(mode for mode in requested_modes if mode != ALL_MODES)]
+    return list(dict.fromkeys(requested_modes))
+
+
+def mode_arguments(cli_args, mode) -> Namespace:
+    # каждый режим получает свой mode, от него зависят имена файлов вывода
+    return Namespace(**{**vars(cli_args), 'mode': mode})
+
+
+def run_mode(session, mode, cli_args, collect=False) -> None:
+    results = MODE_TO_FUNCTION[mode](session, cli_args)
+    if results is None:
+        return None
+    if collect:
+        return list(results)
+    with METRICS.timer(OUTPUT_PHASE):
+        control_output(timed_rows(results), cli_args)
+
+
+def run_sequentially(session, modes, cli_args) -> dict:
+    metrics_by_mode = {}
+    for mode in modes:
+        METRICS.reset()
+        start = perf_counter()
+        try:
+            with METRICS.timer(OTHER_PHASE):
+                run_mode(session, mode, mode_arguments(cli_args, mode))
+        except Exception as exception:
+            logging.error(BASE_EXCEPTION_MESSAGE.format(
+                mode=mode,
+                error=exception))
+        metrics_by_mode[mode] = METRICS.summary(perf_counter() - start)
+    return metrics_by_mode
+
+
+def run_concurrently(session, modes, cli_args) -> dict:
+    # режимы выполняются одновременно на общей сессии, а вывод идёт
+    # по очереди, чтобы таблицы разных режимов не перемешивались
+    METRICS.reset()
+    start = perf_counter()
+    with METRICS.timer(OTHER_PHASE):
+        all_results = map_concurrently(
+            lambda mode: run_mode(
+                session, mode, mode_arguments(cli_args, mode), collect=True),
+            modes,
+            len(modes))
+        for mode, (results, exception) in zip(modes, all_results):
+            if exception is None and results is not None:
+                try:
+                    with METRICS.timer(OUTPUT_PHASE):
+                        control_output(results, mode_arguments(cli_args, mode))
+                except Exception as error:
+                    exception = error
+            if exception is not None:
+                logging.error(BASE_EXCEPTION_MESSAGE.format(
+                    mode=mode,
+                    error=exception))
+    # метрики одновременных режимов не разделить, они общие для запуска
+    return {'+'.join(modes): METRICS.summary(perf_counter() - start)}
+
+
+def rows_diff(previous, results) -> tuple:
+    # строки сравниваются по первому столбцу: ссылке или статусу
+    rows = iter(results)
+    header = next(rows)
+    current = {row[0]: row for row in rows}
+    changed = [row for key, row in current.items() if previous.get(key) != row]
+    removed = [key for key in previous if key not in current]
+    return header, current, changed, removed
+
+
+def watch_tick(session, modes, cli_args, state) -> None:
+    for mode in modes:
+        mode_args = mode_arguments(cli_args, mode)
+        try:
+            results = run_mode(session, mode, mode_args, collect=True)
+            if results is None:
+                continue
+            header, state[mode], changed, removed = rows_diff(
+                state.get(mode, {}), results)
+            for key in removed:
+                logging.info(WATCH_ROW_REMOVED.format(mode=mode, key=key))
+            if not changed:
+                logging.info(WATCH_NO_CHANGES.format(mode=mode))
+                continue
+            with METRICS.timer(OUTPUT_PHASE):
+                control_output([header, *changed], mode_args)
+        except Exception as exception:
+            logging.error(BASE_EXCEPTION_MESSAGE.format(
+                mode=mode,
+                error=exception))
+
+
+def watch(session, modes, cli_args, ticks=None) -> None:
+    # сессия, кеш и предыдущие результаты живут между циклами,
+    # выводятся только новые и изменившиеся строки
+    state = {}
+    for tick in count(1) if ticks is None else range(1, ticks + 1):
+        METRICS.reset()
+        start = perf_counter()
+        with METRICS.timer(OTHER_PHASE):
+            watch_tick(session, modes, cli_args, state)
+        report_metrics(
+            {'+'.join(modes): METRICS.summary(perf_counter() - start)},
+            cli_args)
+        if ticks is None or tick < ticks:
+            sleep(cli_args.watch)
+
+
 def main() -> None:
     configure_logging()
     logging.info('Парсер запущен!')
-    arg_parser = configure_argument_parser(MODE_TO_FUNCTION.keys())
+    arg_parser = configure_argument_parser([*MODE_TO_FUNCTION, ALL_MODES])
     args = arg_parser.parse_args()
     logging.info(ARGUMENTS_MESSAGE.format(args=args))
-    parser_mode = args.mode
+    modes = selected_modes(args.mode)
+    run_modes = run_concurrently if args.parallel_modes else run_sequentially
     try:
-        with CachedSession() as session:
-            if args.clear_cache:
-                session.cache.clear()
-            results = MODE_TO_FUNCTION[parser_mode](session)
-            if results is not None:
-                control_output(results, args)
+        with configure_session(args) as session, parse_processes(
+            args.parse_processes
+        ), extraction_cache(
+            BASE_DIR / EXTRACT_CACHE_NAME, args.extract_cache_size
+        ):
+            if args.watch:
+                watch(session, modes, args)
+            else:
+                report_metrics(run_modes(session, modes, args), args)
+    except KeyboardInterrupt:
+        logging.info(WATCH_STOPPED)
     except Exception as exception:
         logging.error(BASE_EXCEPTION_MESSAGE.format(
-            mode=parser_mode,
+            mode=', '.join(modes),
             error=exception))
     logging.info('Парсер завершил работу.')
 
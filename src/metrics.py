@@ -0,0 +1,136 @@
+# metrics.py
+import json
+import math
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+NETWORK_PHASE = 'network'
+PARSE_PHASE = 'parse'
+EXTRACT_PHASE = 'extract'
+OUTPUT_PHASE = 'output'
+OTHER_PHASE = 'other'
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+    # метод ближайшего ранга, без интерполяции
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+class Metrics:
+    # счётчики общие для потоков пула, время фаз считается
+    # без вложенных фаз: разбор внутри извлечения не учитывается дважды.
+    # phases — сумма по всем потокам и может превышать время работы,
+    # phase_spans — от первого начала фазы до последнего окончания
+    # в любом потоке
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.phases = defaultdict(float)
+            self.spans = {}
+            self.latencies = []
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self.bytes_received = 0
+            self.bytes_cached = 0
+            self.throttled = 0
+            self.throttle_time = 0.0
+            self.retries = 0
+
+    @contextmanager
+    def timer(self, phase):
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            end = perf_counter()
+            elapsed = end - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self.lock:
+                self.phases[phase] += elapsed - nested
+                first, last = self.spans.get(phase, (start, end))
+                self.spans[phase] = (min(first, start), max(last, end))
+
+    def record_response(self, response, elapsed, streamed=False):
+        with self.lock:
+            self.latencies.append(elapsed)
+            if streamed:
+                # тело потокового ответа ещё не прочитано
+                size = int(response.headers.get('Content-Length', 0))
+            else:
+                size = len(response.content)
+            # из сети получены только тела промахов кеша
+            if getattr(response, 'from_cache', False):
+                self.cache_hits += 1
+                self.bytes_cached += size
+            else:
+                self.cache_misses += 1
+                self.bytes_received += size
+
+    def record_throttle(self, delay):
+        with self.lock:
+            self.throttled += 1
+            self.throttle_time += delay
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def summary(self, wall_time=None) -> dict:
+        with self.lock:
+            requests_count = self.cache_hits + self.cache_misses
+            return {
+                'wall_time': wall_time,
+                'phases': dict(self.phases),
+                'phase_spans': {
+                    phase: last - first
+                    for phase, (first, last) in self.spans.items()},
+                'requests': requests_count,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'cache_hit_rate': (
+                    self.cache_hits / requests_count
+                    if requests_count else None),
+                'bytes': self.bytes_received,
+                'cached_bytes': self.bytes_cached,
+                'throttled': self.throttled,
+                'throttle_time': self.throttle_time,
+                'retries': self.retries,
+                'latency': {
+                    f'p{rank}': percentile(self.latencies, rank)
+                    for rank in PERCENTILES},
+            }
+
+
+METRICS = Metrics()
+
+
+def timed_rows(rows, phase=OTHER_PHASE):
+    # строки режима вычисляются лениво, пока их забирает вывод; каждый
+    # шаг генератора учитывается в своей фазе, поэтому в фазу вывода
+    # попадает только работа функции вывода
+    rows = iter(rows)
+    while True:
+        with METRICS.timer(phase):
+            row = next(rows, StopIteration)
+        if row is StopIteration:
+            return
+        yield row
+
+
+def write_metrics(path, metrics_by_mode):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(metrics_by_mode, file, indent=2, ensure_ascii=False)
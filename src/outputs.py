@@ -1,49 +1,169 @@
 # outputs.py
-import csv
+import json
 import logging
-from datetime import datetime
-
-from prettytable import PrettyTable
+import sqlite3
+from datetime import date, datetime
+from itertools import islice
 
 from constants import BASE_DIR, DATETIME_FORMAT
-from constants import FILE_SAVED_AT, PRETTY_OUTPUT, FILE_OUTPUT
+from constants import (
+    FILE_SAVED_AT, PRETTY_OUTPUT, FILE_OUTPUT, JSONL_OUTPUT, PARQUET_OUTPUT,
+    SQLITE_OUTPUT, PYARROW_MISSING, RESULTS_DB_NAME)
 
 
-FILE_NAME_TEMPLATE = '{mode}_{datetime}.csv'
+FILE_NAME_TEMPLATE = '{mode}_{datetime}.{extension}'
+BATCH_SIZE = 1000
 
 
-def file_output(results, cli_args):
+def results_dir():
     # константа определяется здесь, чтобы успокоился pytest
     RESULTS_DIR = BASE_DIR / 'results'
     RESULTS_DIR.mkdir(exist_ok=True)
-    file_name = FILE_NAME_TEMPLATE.format(
+    return RESULTS_DIR
+
+
+def result_path(cli_args, extension):
+    return results_dir() / FILE_NAME_TEMPLATE.format(
         mode=cli_args.mode,
         datetime=datetime.strftime(
-            datetime.now(), DATETIME_FORMAT))
-    file_path = RESULTS_DIR / file_name
+            datetime.now(), DATETIME_FORMAT),
+        extension=extension)
+
+
+def batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def file_output(results, cli_args):
+    import csv
+
+    file_path = result_path(cli_args, 'csv')
+    # строки сбрасываются на диск по мере получения, поэтому при сбое
+    # в файле остаётся всё, что успело обработаться
     with open(file_path, 'w', encoding='utf-8') as file:
-        csv.writer(
-            file,
-            dialect=csv.unix_dialect).writerows(results)
+        writer = csv.writer(file, dialect=csv.unix_dialect)
+        for row in results:
+            writer.writerow(row)
+            file.flush()
     logging.info(FILE_SAVED_AT.format(path=file_path))
 
 
 def default_output(results, *args):
     for row in results:
-        print(*row)
+        print(*row, flush=True)
 
 
 def pretty_output(results, *args):
+    # таблице нужны все строки для расчёта ширины столбцов
+    from prettytable import PrettyTable
+
+    rows = iter(results)
     table = PrettyTable()
-    table.field_names = results[0]
+    table.field_names = next(rows)
     table.align = 'l'
-    table.add_rows(results[1:])
+    table.add_rows(list(rows))
     print(table)
 
 
+def jsonl_output(results, cli_args):
+    rows = iter(results)
+    header = next(rows)
+    file_path = result_path(cli_args, 'jsonl')
+    with open(file_path, 'w', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps(
+                dict(zip(header, row)), ensure_ascii=False, default=str))
+            file.write('\n')
+            file.flush()
+    logging.info(FILE_SAVED_AT.format(path=file_path))
+
+
+def parquet_schema(table):
+    # столбец, пустой во всей первой группе, получает тип null, к которому
+    # не приводится ни один другой тип; такие столбцы хранятся строками
+    import pyarrow
+
+    return pyarrow.schema(
+        field.with_type(pyarrow.string())
+        if pyarrow.types.is_null(field.type) else field
+        for field in table.schema)
+
+
+def parquet_output(results, cli_args):
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(PYARROW_MISSING)
+    rows = iter(results)
+    header = next(rows)
+    file_path = result_path(cli_args, 'parquet')
+    writer = None
+    # строки пишутся группами, схема определяется по первой группе;
+    # при сбое файл закрывается с записанными группами и остаётся читаемым
+    try:
+        for batch in batches(rows):
+            table = pyarrow.Table.from_pydict(
+                dict(zip(header, map(list, zip(*batch)))))
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(
+                    file_path, parquet_schema(table))
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return
+    logging.info(FILE_SAVED_AT.format(path=file_path))
+
+
+def sqlite_value(value):
+    # у sqlite3 нет встроенного преобразования дат начиная с Python 3.12
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def sqlite_output(results, cli_args):
+    rows = iter(results)
+    header = next(rows)
+    table = '"{}"'.format(cli_args.mode.replace('-', '_'))
+    columns = ', '.join('"{}"'.format(column) for column in header)
+    file_path = results_dir() / RESULTS_DB_NAME
+    with sqlite3.connect(file_path) as connection:
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS runs ('
+            'id INTEGER PRIMARY KEY, mode TEXT, started_at TEXT, '
+            'arguments TEXT)')
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            f'run_id INTEGER REFERENCES runs(id), {columns})')
+        run_id = connection.execute(
+            'INSERT INTO runs (mode, started_at, arguments) '
+            'VALUES (?, ?, ?)', (
+                cli_args.mode,
+                datetime.now().isoformat(timespec='seconds'),
+                json.dumps(vars(cli_args), ensure_ascii=False, default=str))
+        ).lastrowid
+        placeholders = ', '.join('?' * (len(header) + 1))
+        for batch in batches(rows):
+            connection.executemany(
+                f'INSERT INTO {table} VALUES ({placeholders})',
+                ((run_id, *map(sqlite_value, row)) for row in batch))
+            connection.commit()
+    connection.close()
+    logging.info(FILE_SAVED_AT.format(path=file_path))
+
+
 OUTPUT_EXECUTORS = {
     PRETTY_OUTPUT: pretty_output,
     FILE_OUTPUT: file_output,
+    JSONL_OUTPUT: jsonl_output,
+    PARQUET_OUTPUT: parquet_output,
+    SQLITE_OUTPUT: sqlite_output,
     None: default_output
 }
 
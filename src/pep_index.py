@@ -0,0 +1,70 @@
+# pep_index.py
+import json
+import sqlite3
+import threading
+from typing import NamedTuple, Optional
+
+
+class PepRecord(NamedTuple):
+    url: str
+    table_status: str
+    article_status: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    # все поля заголовка статьи, см. utils.extract_fields
+    fields: Optional[dict] = None
+
+
+class PepIndex:
+    # локальный индекс статусов PEP, общий для потоков пула загрузки
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS peps ('
+                'url TEXT PRIMARY KEY, '
+                'table_status TEXT NOT NULL, '
+                'article_status TEXT NOT NULL, '
+                'etag TEXT, '
+                'last_modified TEXT, '
+                'fetched_at REAL NOT NULL, '
+                'fields TEXT)')
+            columns = [
+                column[1] for column in self.connection.execute(
+                    'PRAGMA table_info(peps)')]
+            # индексы прежних версий хранили только статус
+            if 'fields' not in columns:
+                self.connection.execute(
+                    'ALTER TABLE peps ADD COLUMN fields TEXT')
+
+    def get(self, url) -> Optional[PepRecord]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT url, table_status, article_status, etag, '
+                'last_modified, fetched_at, fields FROM peps WHERE url = ?',
+                (url,)).fetchone()
+        if row is None:
+            return None
+        *columns, fields = row
+        return PepRecord(*columns, None if fields is None else json.loads(
+            fields))
+
+    def save(self, record: PepRecord) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO peps (url, table_status, '
+                'article_status, etag, last_modified, fetched_at, fields) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (*record[:-1], None if record.fields is None else json.dumps(
+                    record.fields, ensure_ascii=False)))
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
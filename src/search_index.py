@@ -0,0 +1,158 @@
+# search_index.py
+import heapq
+import math
+import re
+import sqlite3
+import zlib
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r'\w\w+')
+# параметры ранжирования BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text) -> list:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def encode_varints(numbers) -> bytes:
+    # 7 бит на байт, старший бит — признак продолжения числа
+    encoded = bytearray()
+    for number in numbers:
+        while number >= 0x80:
+            encoded.append(number & 0x7F | 0x80)
+            number >>= 7
+        encoded.append(number)
+    return bytes(encoded)
+
+
+def decode_varints(data) -> list:
+    numbers, number, shift = [], 0, 0
+    for byte in data:
+        number |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        numbers.append(number)
+        number, shift = 0, 0
+    return numbers
+
+
+def encode_postings(postings) -> bytes:
+    # пары (документ, частота) по возрастанию документа; номера
+    # хранятся разностями, поэтому почти все умещаются в один байт
+    numbers, previous = [], 0
+    for doc_id, frequency in postings:
+        numbers += (doc_id - previous, frequency)
+        previous = doc_id
+    return zlib.compress(encode_varints(numbers))
+
+
+def decode_postings(data) -> list:
+    numbers = decode_varints(zlib.decompress(data))
+    postings, doc_id = [], 0
+    for delta, frequency in zip(numbers[::2], numbers[1::2]):
+        doc_id += delta
+        postings.append((doc_id, frequency))
+    return postings
+
+
+class SearchIndex:
+    # обратный индекс: термин -> сжатый список (документ, частота)
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                'id INTEGER PRIMARY KEY, '
+                'url TEXT NOT NULL UNIQUE, '
+                'title TEXT, '
+                'length INTEGER NOT NULL)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS terms ('
+                'term TEXT PRIMARY KEY, '
+                'frequency INTEGER NOT NULL, '
+                'postings BLOB NOT NULL)')
+
+    def build(self, documents) -> tuple:
+        # индекс пересобирается целиком из переданных страниц
+        # (url, заголовок, текст), поэтому удалённые страницы в нём
+        # не остаются
+        postings = defaultdict(list)
+        with self.connection:
+            self.connection.execute('DELETE FROM documents')
+            self.connection.execute('DELETE FROM terms')
+            for doc_id, (url, title, text) in enumerate(documents, 1):
+                tokens = tokenize(f'{title or ""} {text}')
+                self.connection.execute(
+                    'INSERT INTO documents VALUES (?, ?, ?, ?)',
+                    (doc_id, url, title, len(tokens)))
+                for term, frequency in Counter(tokens).items():
+                    postings[term].append((doc_id, frequency))
+            self.connection.executemany(
+                'INSERT INTO terms VALUES (?, ?, ?)',
+                ((term, len(entries), encode_postings(entries))
+                 for term, entries in postings.items()))
+        self.connection.execute('VACUUM')
+        return len(self), len(postings)
+
+    def search(self, query, limit=10) -> list:
+        documents, average_length = self.connection.execute(
+            'SELECT COUNT(*), AVG(length) FROM documents').fetchone()
+        if not documents:
+            return []
+        lengths = {}
+        scores = Counter()
+        for term in set(tokenize(query)):
+            row = self.connection.execute(
+                'SELECT frequency, postings FROM terms WHERE term = ?',
+                (term,)).fetchone()
+            if row is None:
+                continue
+            frequency, data = row
+            idf = math.log(1 + (documents - frequency + 0.5) / (
+                frequency + 0.5))
+            postings = decode_postings(data)
+            missing = [
+                doc_id for doc_id, _ in postings if doc_id not in lengths]
+            lengths.update(self.lengths(missing))
+            for doc_id, count in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * (
+                    lengths[doc_id] / average_length))
+                scores[doc_id] += idf * count * (BM25_K1 + 1) / (
+                    count + norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        titles = dict(self.titles([doc_id for doc_id, _ in best]))
+        return [
+            (*titles[doc_id], round(score, 3)) for doc_id, score in best]
+
+    def lengths(self, doc_ids) -> dict:
+        return {
+            doc_id: length for doc_id, _, length in self.rows(
+                'id, url, length', doc_ids)}
+
+    def titles(self, doc_ids):
+        for doc_id, url, title in self.rows('id, url, title', doc_ids):
+            yield doc_id, (url, title)
+
+    def rows(self, columns, doc_ids):
+        # ограничение SQLite на число параметров запроса
+        for start in range(0, len(doc_ids), 900):
+            chunk = doc_ids[start:start + 900]
+            yield from self.connection.execute(
+                f'SELECT {columns} FROM documents WHERE id IN '
+                f'({", ".join("?" * len(chunk))})', chunk)
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
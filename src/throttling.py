@@ -0,0 +1,133 @@
+# throttling.py
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+
+RETRY_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+# ответы, после которых скорость запросов к хосту снижается
+SLOW_DOWN_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+MIN_RATE_FACTOR = 0.1
+RATE_RECOVERY_STEP = 0.05
+
+
+def backoff_delay(attempt, retry_after=None):
+    # Retry-After сервера важнее собственной оценки
+    if retry_after is not None:
+        seconds = parse_retry_after(retry_after)
+        if seconds is not None:
+            return min(seconds, BACKOFF_MAX)
+    delay = min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX)
+    return random.uniform(delay / 2, delay)
+
+
+def parse_retry_after(value):
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock):
+        self.rate = rate
+        self.factor = 1.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def reserve(self):
+        # токен резервируется сразу, вызывающий сам ждёт
+        # возвращённое время: time.sleep в потоке или asyncio.sleep
+        now = self.clock()
+        rate = self.rate * self.factor
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+
+class RateLimiter:
+    # отдельное ведро на каждый хост; при 429/503 скорость хоста
+    # снижается вдвое и постепенно восстанавливается после успехов
+    def __init__(self, rate=None, burst=None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or max(rate or 1, 1)
+        self.clock = clock
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(
+                self.rate, self.burst, self.clock)
+        return self.buckets[host]
+
+    def reserve(self, url):
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            delay = self.bucket(url).reserve()
+        if delay:
+            METRICS.record_throttle(delay)
+        return delay
+
+    def feedback(self, url, status_code):
+        if not self.rate:
+            return
+        with self.lock:
+            bucket = self.bucket(url)
+            if status_code in SLOW_DOWN_STATUSES:
+                bucket.factor = max(bucket.factor / 2, MIN_RATE_FACTOR)
+            else:
+                bucket.factor = min(bucket.factor + RATE_RECOVERY_STEP, 1.0)
+
+    def wait(self, url):
+        time.sleep(self.reserve(url))
+
+    async def wait_async(self, url):
+        import asyncio
+
+        await asyncio.sleep(self.reserve(url))
+
+
+class ThrottledHTTPAdapter(HTTPAdapter):
+    # ограничение применяется на уровне транспорта, поэтому ответы
+    # из кеша requests_cache не расходуют токены
+    def __init__(self, limiter, timeout=None, **kwargs):
+        self.limiter = limiter
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        # requests передаёт timeout=None, если он не указан при вызове
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        self.limiter.wait(request.url)
+        response = super().send(request, **kwargs)
+        self.limiter.feedback(request.url, response.status_code)
+        return response
@@ -1,7 +1,44 @@
-from bs4 import BeautifulSoup as Soup
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from contextlib import contextmanager
+from collections import deque
+from functools import partial
+from io import BytesIO
+from itertools import islice
+from time import perf_counter, sleep
+from typing import NamedTuple, Optional
 
-from constants import TAG_NOT_FOUND_MESSAGE, CONNECTION_ERROR_MESSAGE
+from constants import (
+    TAG_NOT_FOUND_MESSAGE, CONNECTION_ERROR_MESSAGE, DEFAULT_WORKERS,
+    BS4_PARSER, LXML_PARSER, ENCODING, DEFAULT_RETRIES, RETRY_MESSAGE)
+from metrics import METRICS, NETWORK_PHASE, PARSE_PHASE, EXTRACT_PHASE
+
+# bs4, lxml и requests импортируются при первом использовании:
+# запуск с --help и режимы без разбора не платят за их загрузку
+
+# пул процессов для разбора, см. parse_processes
+PARSE_EXECUTOR = None
+# кеш результатов извлечения, см. extraction_cache
+EXTRACT_CACHE = None
+# задач в очереди пула на один поток, см. map_with_items
+WINDOW_PER_WORKER = 2
+# потоковый результат длиннее этого не сохраняется в кеш извлечения
+MEMOIZED_ITEMS_LIMIT = 5000
+
+
+class TableRow(NamedTuple):
+    table: int
+    status: Optional[str]
+    href: str
+    title: str
+
+
+class Fetch(NamedTuple):
+    # запрос страницы, который планирует режим; context передаётся
+    # обработчику ответа без изменений
+    url: str
+    headers: Optional[dict] = None
+    context: object = None
 
 
 class ParserFindTagException(Exception):
@@ -12,21 +49,316 @@ class ParserStatusMissingException(Exception):
     pass
 
 
-def get_response(session, url):
+def send_with_retries(session, url, method, **kwargs):
+    # 429/5xx и сетевые ошибки повторяются с экспоненциальной задержкой;
+    # после последней попытки возвращается последний ответ
+    from requests.exceptions import RequestException
+
+    from throttling import RETRY_STATUSES, backoff_delay
+
+    retries = getattr(session, 'retries', DEFAULT_RETRIES)
+    for attempt in range(retries + 1):
+        try:
+            response = session.request(method, url, **kwargs)
+        except RequestException as error:
+            if attempt == retries:
+                raise
+            reason, delay = error, backoff_delay(attempt)
+        else:
+            if (response.status_code not in RETRY_STATUSES
+                    or attempt == retries):
+                return response
+            reason = response.status_code
+            delay = backoff_delay(
+                attempt, response.headers.get('Retry-After'))
+            response.close()
+        METRICS.record_retry()
+        logging.warning(RETRY_MESSAGE.format(
+            url=url, attempt=attempt + 1, delay=delay, reason=reason))
+        sleep(delay)
+
+
+def get_response(session, url, method='GET', **kwargs):
+    from requests.exceptions import RequestException
+
+    start = perf_counter()
     try:
-        response = session.get(url)
-        response.encoding = 'utf-8'
-        return response
-    except requests.exceptions.RequestException:
+        with METRICS.timer(NETWORK_PHASE):
+            response = send_with_retries(session, url, method, **kwargs)
+    except RequestException:
         raise ConnectionError(
             CONNECTION_ERROR_MESSAGE.format(url=url))
+    METRICS.record_response(
+        response, perf_counter() - start, kwargs.get('stream', False))
+    response.encoding = ENCODING
+    return response
+
+
+def make_soup(text, strainer=None, features='lxml'):
+    from bs4 import BeautifulSoup as Soup
+
+    with METRICS.timer(PARSE_PHASE):
+        return Soup(text, parse_only=strainer, features=features)
 
 
 def get_soup(session, url, strainer=None, features='lxml'):
-    return Soup(
-        get_response(session, url).text,
-        parse_only=strainer,
-        features=features)
+    return make_soup(get_response(session, url).text, strainer, features)
+
+
+def iter_html(content, tag):
+    # разбор останавливается, как только потребитель перестаёт
+    # запрашивать элементы, поэтому хвост страницы не разбирается вовсе
+    from lxml import etree
+
+    events = etree.iterparse(
+        BytesIO(content),
+        events=('end',),
+        tag=tag,
+        html=True,
+        encoding=ENCODING,
+        recover=True)
+    while True:
+        with METRICS.timer(PARSE_PHASE):
+            event = next(events, None)
+        if event is None:
+            return
+        yield event[1]
+
+
+def first_element(content, tag):
+    # первый элемент в порядке документа вместе с вложенными; событие end
+    # вложенного элемента с тем же тегом приходит раньше, поэтому
+    # запоминается первое событие start
+    from lxml import etree
+
+    first = None
+    with METRICS.timer(PARSE_PHASE):
+        for event, element in etree.iterparse(
+            BytesIO(content),
+            events=('start', 'end'),
+            tag=tag,
+            html=True,
+            encoding=ENCODING,
+            recover=True
+        ):
+            if first is None:
+                first = element
+            elif event == 'end' and element is first:
+                return first
+    return None
+
+
+def element_text(element):
+    return ''.join(element.itertext())
+
+
+def drop_processed(element):
+    # разобранный элемент и всё, что было перед ним, удаляются из дерева,
+    # поэтому память не растёт вместе с числом строк
+    element.clear()
+    parent = element.getparent()
+    if parent is None:
+        return
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def iter_table_rows(content):
+    # строки отдаются по мере разбора: загрузка первых статей начинается,
+    # пока хвост страницы ещё не разобран
+    table = 1
+    for element in iter_html(content, ('tr', 'table')):
+        if element.tag == 'table':
+            table += 1
+        else:
+            links = element.findall('.//a')
+            if links:
+                status = element.find('.//abbr')
+                yield TableRow(
+                    table,
+                    None if status is None else element_text(status),
+                    links[0].get('href'),
+                    element_text(links[-1]))
+        drop_processed(element)
+
+
+def extract_page(content) -> tuple:
+    # заголовок страницы и все ссылки в порядке документа
+    title, links = None, []
+    for element in iter_html(content, ('title', 'a')):
+        if element.tag == 'title' and title is None:
+            title = element_text(element).strip()
+        elif element.tag == 'a' and element.get('href'):
+            links.append(element.get('href'))
+        drop_processed(element)
+    return title, links
+
+
+def extract_text(content) -> tuple:
+    # заголовок и видимый текст страницы для полнотекстового индекса
+    from lxml import etree
+
+    with METRICS.timer(PARSE_PHASE):
+        root = etree.HTML(content) if content else None
+    if root is None:
+        return None, ''
+    etree.strip_elements(root, 'script', 'style', with_tail=False)
+    title = root.findtext('.//title')
+    return (
+        None if title is None else title.strip(),
+        ' '.join(root.itertext()))
+
+
+def extract_fields_bs4(content) -> dict:
+    from bs4 import SoupStrainer
+
+    soup = make_soup(
+        content.decode(ENCODING, 'replace'), SoupStrainer('dl'))
+    if soup.dl is None:
+        return {}
+    return {
+        tag.text.rstrip(':'): tag.find_next_sibling().text
+        for tag in soup.dl('dt')}
+
+
+def extract_fields_lxml(content) -> dict:
+    for dl in iter_html(content, 'dl'):
+        return {
+            element_text(dt).rstrip(':'): element_text(dt.getnext())
+            for dt in dl.iterchildren('dt')
+            if dt.getnext() is not None}
+    return {}
+
+
+def extract_section_bs4(content) -> tuple:
+    # битые байты заменяются, как в response.text
+    section = make_soup(content.decode(ENCODING, 'replace')).section
+    return (section.h1.text.rstrip('¶'),
+            section.dl.text.replace('\n', ' '))
+
+
+def extract_section_lxml(content) -> tuple:
+    # как и в bs4, заголовок и авторы ищутся только в первой секции:
+    # списки определений в навигации до неё не учитываются
+    section = first_element(content, 'section')
+    title = None if section is None else section.find('.//h1')
+    authors = None if section is None else section.find('.//dl')
+    if title is None or authors is None:
+        raise ParserFindTagException(TAG_NOT_FOUND_MESSAGE.format(
+            tag='dl' if title is not None else 'h1', attrs=None))
+    return (element_text(title).rstrip('¶'),
+            element_text(authors).replace('\n', ' '))
+
+
+FIELD_EXTRACTORS = {
+    BS4_PARSER: extract_fields_bs4,
+    LXML_PARSER: extract_fields_lxml,
+}
+SECTION_EXTRACTORS = {
+    BS4_PARSER: extract_section_bs4,
+    LXML_PARSER: extract_section_lxml,
+}
+
+
+@contextmanager
+def parse_processes(processes):
+    # в процессы передаются байты страницы, обратно возвращаются
+    # только извлечённые значения, деревья разбора не сериализуются
+    global PARSE_EXECUTOR
+    if not processes:
+        yield
+        return
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn вместо fork: к моменту разбора уже работают потоки загрузки
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn')
+    ) as executor:
+        PARSE_EXECUTOR = executor
+        try:
+            yield
+        finally:
+            PARSE_EXECUTOR = None
+
+
+@contextmanager
+def extraction_cache(path, max_entries):
+    # тело страницы из кеша HTTP даёт тот же хеш, поэтому при тёплом
+    # запуске извлечённые значения берутся без разбора HTML
+    global EXTRACT_CACHE
+    if not max_entries:
+        yield
+        return
+    from extract_cache import ExtractCache
+
+    with ExtractCache(path, max_entries) as cache:
+        EXTRACT_CACHE = cache
+        try:
+            yield
+        finally:
+            EXTRACT_CACHE = None
+
+
+def call_extractor(extractor, content):
+    if PARSE_EXECUTOR is None:
+        return extractor(content)
+    return PARSE_EXECUTOR.submit(extractor, content).result()
+
+
+def run_extractor(extractor, content, memoize=True):
+    # memoize=False для объёмных результатов вроде полного текста страницы
+    with METRICS.timer(EXTRACT_PHASE):
+        if EXTRACT_CACHE is None or not memoize:
+            return call_extractor(extractor, content)
+        from extract_cache import extractor_key
+
+        key = extractor_key(extractor, content)
+        try:
+            return EXTRACT_CACHE.get(key)
+        except KeyError:
+            value = call_extractor(extractor, content)
+            EXTRACT_CACHE.save(key, value)
+            return value
+
+
+def iter_extracted(extractor, content):
+    # потоковый извлекатель сохраняется в кеш, только если его результат
+    # прочитан до конца и не длиннее MEMOIZED_ITEMS_LIMIT: копия длинного
+    # результата съела бы выигрыш от потокового разбора
+    if EXTRACT_CACHE is None:
+        yield from extractor(content)
+        return
+    from extract_cache import extractor_key
+
+    key = extractor_key(extractor, content)
+    try:
+        items = EXTRACT_CACHE.get(key)
+    except KeyError:
+        pass
+    else:
+        yield from items
+        return
+    items = []
+    for item in extractor(content):
+        if items is not None:
+            items.append(item)
+            if len(items) > MEMOIZED_ITEMS_LIMIT:
+                items = None
+        yield item
+    if items is not None:
+        EXTRACT_CACHE.save(key, items)
+
+
+def extract_fields(content, parser=BS4_PARSER) -> dict:
+    # поля первого списка определений статьи: {'Status': 'Final', ...}
+    return run_extractor(FIELD_EXTRACTORS[parser], content)
+
+
+def extract_section(content, parser=BS4_PARSER) -> tuple:
+    # заголовок и блок авторов первой секции страницы
+    return run_extractor(SECTION_EXTRACTORS[parser], content)
 
 
 def find_tag(soup, tag, attrs=None):
@@ -35,3 +367,125 @@ def find_tag(soup, tag, attrs=None):
         raise ParserFindTagException(
             TAG_NOT_FOUND_MESSAGE.format(tag=tag, attrs=attrs))
     return searched_tag
+
+
+def map_with_items(func, iterable, workers=DEFAULT_WORKERS):
+    # результаты отдаются в порядке исходных элементов тройками
+    # (элемент, результат, исключение), чтобы ошибка одной страницы
+    # не прерывала обработку остальных. Элементы забираются из iterable
+    # по мере освобождения окна в workers * WINDOW_PER_WORKER задач,
+    # поэтому ни входной поток, ни готовые результаты не копятся в памяти
+    workers = max(workers, 1)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in iterable:
+            pending.append((item, executor.submit(capture, func, item)))
+            if len(pending) >= workers * WINDOW_PER_WORKER:
+                item, future = pending.popleft()
+                yield (item, *future.result())
+        while pending:
+            item, future = pending.popleft()
+            yield (item, *future.result())
+
+
+def map_concurrently(func, iterable, workers=DEFAULT_WORKERS):
+    # пары (результат, исключение) в порядке исходных элементов
+    for _, result, exception in map_with_items(func, iterable, workers):
+        yield result, exception
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def capture(func, *args):
+    try:
+        return func(*args), None
+    except Exception as exception:
+        return None, exception
+
+
+def collect_responses(future, fetches):
+    # ответы группы запросов асинхронного движка с теми же метриками
+    # и ошибками, что у get_response
+    with METRICS.timer(NETWORK_PHASE):
+        results = future.result()
+    for fetch, response in zip(fetches, results):
+        if isinstance(response, Exception):
+            yield None, ConnectionError(
+                CONNECTION_ERROR_MESSAGE.format(url=fetch.url))
+            continue
+        METRICS.record_response(response, response.latency)
+        response.encoding = ENCODING
+        yield response, None
+
+
+def submit_fetches(session, plan, batch):
+    planned = [capture(plan, item) for item in batch]
+    fetches = [value for value, _ in planned if isinstance(value, Fetch)]
+    future = session.submit_many(
+        ('GET', fetch.url, fetch.headers) for fetch in fetches)
+    return batch, planned, fetches, future
+
+
+def complete_fetch(finish, task):
+    item, value, response, exception = task
+    if exception is not None:
+        raise exception
+    if not isinstance(value, Fetch):
+        return value
+    return finish(item, response, value)
+
+
+def finish_fetches(finish, submitted, workers):
+    batch, planned, fetches, future = submitted
+    responses = collect_responses(future, fetches)
+    tasks = []
+    for item, (value, exception) in zip(batch, planned):
+        response = None
+        if isinstance(value, Fetch):
+            response, exception = next(responses)
+        tasks.append((item, value, response, exception))
+    for task, result, exception in map_with_items(
+            partial(complete_fetch, finish), tasks, workers):
+        yield task[0], result, exception
+
+
+def map_fetched_async(session, plan, finish, items, workers):
+    # следующая группа запросов отправляется до разбора предыдущей
+    pending = None
+    for batch in chunks(items, session.pool_size * 2):
+        submitted = submit_fetches(session, plan, batch)
+        if pending is not None:
+            yield from finish_fetches(finish, pending, workers)
+        pending = submitted
+    if pending is not None:
+        yield from finish_fetches(finish, pending, workers)
+
+
+def map_fetched(session, plan, finish, items, workers=DEFAULT_WORKERS):
+    # plan(item) возвращает Fetch, если для элемента нужна страница,
+    # иначе готовый результат; finish(item, response, fetch) разбирает
+    # ответ. Результаты — тройки (элемент, результат, исключение)
+    # в исходном порядке.
+    # Синхронный движок загружает и разбирает страницу в одном потоке
+    # пула; асинхронный отправляет запросы группами в цикл событий,
+    # где одновременно выполняется до --pool-size запросов, а следующая
+    # группа загружается, пока разбирается предыдущая
+    if hasattr(session, 'submit_many'):
+        yield from map_fetched_async(session, plan, finish, items, workers)
+        return
+
+    def call(item):
+        fetch = plan(item)
+        if not isinstance(fetch, Fetch):
+            return fetch
+        return finish(item, get_response(
+            session, fetch.url, headers=fetch.headers), fetch)
+
+    yield from map_with_items(call, items, workers)
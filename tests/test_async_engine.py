@@ -0,0 +1,161 @@
+import threading
+import time
+from argparse import Namespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+try:
+    from src import async_engine, main, utils
+except ModuleNotFoundError:
+    assert False, (
+        'Убедитесь что в директории `src` есть файл `async_engine.py`')
+except ImportError:
+    assert False, (
+        'Убедитесь что в директории `src` есть файл `async_engine.py`')
+
+PAGES = {
+    '/': (
+        '<html><body><table>'
+        '<tr><td><abbr>SF</abbr></td><td><a href="pep-0001/">1</a></td></tr>'
+        '<tr><td><abbr>SR</abbr></td><td><a href="pep-0002/">2</a></td></tr>'
+        '</table></body></html>'),
+    '/pep-0001/': '<html><dl><dt>Status:</dt><dd>Final</dd></dl></html>',
+    '/pep-0002/': '<html><dl><dt>Status:</dt><dd>Rejected</dd></dl></html>',
+    '/api/peps.json': (
+        '{"1": {"number": 1, "status": "Final", '
+        '"url": "http://HOST/pep-0001/"}, '
+        '"2": {"number": 2, "status": "Rejected", '
+        '"url": "http://HOST/pep-0002/"}}'),
+}
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        body = body.replace('HOST', self.headers['Host']).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def peps_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_port}/'
+    monkeypatch.setattr(main, 'PEPS_URL', url)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def async_session():
+    with async_engine.AsyncSession('test', 'memory') as session:
+        yield session
+
+
+def test_async_session_caches_responses(peps_server, async_session):
+    first = main.get_response(async_session, peps_server + 'pep-0001/')
+    second = main.get_response(async_session, peps_server + 'pep-0001/')
+    assert first.status_code == 200
+    assert 'Final' in second.text
+    assert not first.from_cache
+    assert second.from_cache
+
+
+def test_async_session_raises_connection_error(async_session):
+    with pytest.raises(ConnectionError):
+        main.get_response(async_session, 'http://127.0.0.1:9/')
+
+
+def test_pep_runs_on_async_engine(
+    monkeypatch, tmp_path, peps_server, async_session
+):
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    got = list(main.pep(
+        async_session, Namespace(workers=4, parser='lxml')))
+    assert got == [
+        ('Статус', 'Количество'),
+        ('Final', 1),
+        ('Rejected', 1),
+        ('Все PEP', 2),
+    ]
+
+
+@pytest.mark.parametrize('source', ['api', 'cross-check'])
+def test_pep_api_source_runs_on_async_engine(
+    monkeypatch, tmp_path, peps_server, async_session, source
+):
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    monkeypatch.setattr(main, 'PEPS_API_URL', peps_server + 'api/peps.json')
+    # статусы статей берутся из API, страницы статей не нужны
+    monkeypatch.delitem(PAGES, '/pep-0001/')
+    monkeypatch.delitem(PAGES, '/pep-0002/')
+    got = list(main.pep(
+        async_session, Namespace(workers=4, pep_source=source)))
+    assert ('Final', 1) in got and ('Rejected', 1) in got
+    assert got[-1] == ('Все PEP', 2)
+
+
+def test_async_session_streams_without_cache(peps_server, async_session):
+    with main.get_response(
+        async_session, peps_server, stream=True, cached=False
+    ) as response:
+        body = b''.join(response.iter_content(16))
+    assert body == PAGES['/'].encode('utf-8')
+    assert not main.get_response(async_session, peps_server).from_cache
+    assert main.get_response(async_session, peps_server).from_cache
+
+
+class SlowHandler(PageHandler):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(0.1)
+        with cls.lock:
+            cls.active -= 1
+        self.path = '/pep-0001/'
+        super().do_GET()
+
+
+def test_map_fetched_fans_out_past_workers():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/'
+    try:
+        with async_engine.AsyncSession(
+            'test', 'memory', pool_size=8
+        ) as session:
+            got = list(utils.map_fetched(
+                session,
+                # отрицательным номерам страница не нужна
+                lambda number: (
+                    (number, 'ready') if number < 0
+                    else utils.Fetch(f'{url}{number}')),
+                lambda number, response, fetch: (number, response.text),
+                [-1, *range(12)],
+                workers=1))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert [number for number, _, _ in got] == [-1, *range(12)]
+    assert got[0] == (-1, (-1, 'ready'), None)
+    assert all('Final' in text for _, (_, text), _ in got[1:])
+    # один поток обработки, но до pool_size запросов одновременно
+    assert 1 < SlowHandler.peak <= 8
@@ -0,0 +1,90 @@
+import pytest
+import requests_mock
+from requests_cache import CachedSession
+try:
+    from src import cache_store
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `cache_store.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `cache_store.py`'
+
+BODY = '<html><body>' + 'boilerplate ' * 2000 + '</body></html>'
+
+
+def make_session(tmp_path, **kwargs):
+    session = CachedSession(backend=cache_store.CompressedCache(
+        str(tmp_path / 'http_cache'), **kwargs))
+    adapter = requests_mock.Adapter()
+    for page in 'abcd':
+        adapter.register_uri(
+            'GET', f'mock://docs/{page}', text=BODY.replace('body', page))
+    adapter.register_uri('GET', 'mock://docs/copy', text=BODY)
+    adapter.register_uri('GET', 'mock://docs/same', text=BODY)
+    session.mount('mock://', adapter)
+    return session
+
+
+def bodies_count(cache):
+    with cache.responses.connection() as con:
+        return con.execute(
+            f'SELECT COUNT(*) FROM {cache.responses.bodies_table}'
+        ).fetchone()[0]
+
+
+@pytest.mark.parametrize('codec', ['gzip', None])
+def test_compressed_cache_round_trip(tmp_path, codec):
+    session = make_session(tmp_path, codec=codec)
+    session.get('mock://docs/a')
+    response = session.get('mock://docs/a')
+    assert response.from_cache
+    assert response.text == BODY.replace('body', 'a')
+    assert session.cache.responses.stored_size() < len(BODY) / 10
+
+
+def test_compressed_cache_deduplicates_bodies(tmp_path):
+    session = make_session(tmp_path)
+    session.get('mock://docs/copy')
+    session.get('mock://docs/same')
+    assert len(session.cache.responses) == 2
+    assert bodies_count(session.cache) == 1
+    session.cache.delete(urls=['mock://docs/copy'])
+    assert bodies_count(session.cache) == 1
+    assert session.get('mock://docs/same').from_cache
+
+
+def test_compressed_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(0, 10_000, 100))
+    monkeypatch.setattr(cache_store, 'time', lambda: next(clock))
+    session = make_session(tmp_path)
+    session.get('mock://docs/a')
+    entry_size = session.cache.responses.stored_size()
+    session.cache.responses.max_size = entry_size * 2.5
+    session.get('mock://docs/b')
+    session.get('mock://docs/a')
+    session.get('mock://docs/c')
+    assert set(session.cache.urls) == {'mock://docs/a', 'mock://docs/c'}
+    assert bodies_count(session.cache) == 2
+
+
+def test_compressed_cache_clear(tmp_path):
+    session = make_session(tmp_path)
+    session.get('mock://docs/a')
+    session.cache.clear()
+    assert len(session.cache.responses) == 0
+    assert bodies_count(session.cache) == 0
+
+
+def test_compressed_cache_tracks_size_incrementally(tmp_path):
+    session = make_session(tmp_path)
+    for page in ('a', 'b', 'copy', 'same'):
+        session.get(f'mock://docs/{page}')
+    responses = session.cache.responses
+    key = next(iter(responses))
+    responses[key] = responses[key]
+    session.cache.delete(urls=['mock://docs/b'])
+    with responses.connection() as con:
+        actual = con.execute(
+            f'SELECT (SELECT SUM(LENGTH(value)) FROM {responses.table_name})'
+            f' + (SELECT SUM(LENGTH(data)) FROM {responses.bodies_table})'
+        ).fetchone()[0]
+    assert responses.stored_size() == actual
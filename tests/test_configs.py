@@ -1,11 +1,14 @@
 import pytest
 import argparse
+from datetime import timedelta
 try:
     from src import configs
 except ModuleNotFoundError:
     assert False, 'Убедитесь что в директории `src` есть файл `configs.py`'
 except ImportError:
     assert False, 'Убедитесь что в директории `src` есть файл `configs.py`'
+# configs импортирует throttling лениво, по пути src
+from throttling import ThrottledHTTPAdapter
 
 
 def test_configs_file():
@@ -29,7 +32,7 @@ def test_configs_file():
     ),
     (
         argparse._StoreAction, ['-o', '--output'], 'output',
-        ('pretty', 'file'),
+        ('pretty', 'file', 'jsonl', 'parquet', 'sqlite'),
         'Дополнительные способы вывода данных'
     ),
 ])
@@ -64,3 +67,48 @@ def test_configure_argument_parser(
     assert got_action.help == help_str, (
         f'Укажите help-строку cli аргумента {got_action.dest}'
     )
+
+
+def test_configure_session_applies_cache_policy():
+    args = configs.configure_argument_parser(['pep']).parse_args(
+        ['pep', '--cache-backend', 'memory'])
+    with configs.configure_session(args) as session:
+        assert session.cache.__class__.__name__ == 'BaseCache'
+        assert session.expire_after == configs.CACHE_EXPIRE_AFTER
+        assert session.urls_expire_after == configs.URLS_EXPIRE_AFTER
+        assert not session.stale_if_error
+
+
+def test_configure_session_tunes_connection_pool():
+    args = configs.configure_argument_parser(['pep']).parse_args([
+        'pep', '--cache-backend', 'memory', '--pool-size', '32',
+        '--connect-timeout', '2', '--read-timeout', '9',
+        '--accept-encoding', 'gzip'])
+    with configs.configure_session(args) as session:
+        adapter = session.get_adapter('https://peps.python.org/')
+        assert isinstance(adapter, ThrottledHTTPAdapter)
+        assert adapter._pool_maxsize == 32
+        assert adapter._pool_block
+        assert adapter.timeout == (2.0, 9.0)
+        assert session.headers['Accept-Encoding'] == 'gzip'
+
+
+def test_watch_caps_cache_expiration():
+    args = configs.configure_argument_parser(['pep']).parse_args(
+        ['pep', '--cache-backend', 'memory', '--watch', '60'])
+    with configs.configure_session(args) as session:
+        assert session.expire_after == timedelta(seconds=60)
+        assert all(
+            expire_after == configs.NEVER_EXPIRE
+            or expire_after <= timedelta(seconds=60)
+            for expire_after in session.urls_expire_after.values())
+        assert configs.NEVER_EXPIRE in session.urls_expire_after.values()
+
+
+def test_configure_session_compressed_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(configs, 'HTTP_CACHE_NAME', tmp_path / 'http_cache')
+    args = configs.configure_argument_parser(['pep']).parse_args(
+        ['pep', '--cache-backend', 'compressed', '--cache-max-size', '0.5'])
+    with configs.configure_session(args) as session:
+        assert session.cache.__class__.__name__ == 'CompressedCache'
+        assert session.cache.responses.max_size == 2 ** 19
@@ -0,0 +1,93 @@
+try:
+    from src import crawler
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `crawler.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `crawler.py`'
+
+DOCS = 'https://docs.python.org/3/'
+
+
+def test_normalize_url():
+    assert crawler.normalize_url(
+        'HTTPS://Docs.Python.org/3/library/index.html#os'
+    ) == 'https://docs.python.org/3/library/'
+    assert crawler.normalize_url('https://docs.python.org') == (
+        'https://docs.python.org/')
+
+
+def test_bloom_filter_has_fixed_size():
+    bloom = crawler.BloomFilter(1000)
+    size = len(bloom.bits)
+    urls = [f'{DOCS}page-{number}.html' for number in range(1000)]
+    for url in urls:
+        bloom.add(url)
+    assert all(url in bloom for url in urls)
+    assert len(bloom.bits) == size
+    false_positives = sum(
+        f'{DOCS}other-{number}.html' in bloom for number in range(1000))
+    assert false_positives < 20
+
+
+def test_visited_set_deduplicates_normalized_urls():
+    visited = crawler.VisitedSet(100)
+    assert visited.add(f'{DOCS}library/')
+    assert not visited.add(f'{DOCS}library/index.html#top')
+    assert visited.add(f'{DOCS}library/os.html')
+    assert len(visited) == 2
+
+
+def test_visited_set_merges_hashes_into_array(monkeypatch):
+    monkeypatch.setattr(crawler, 'MERGE_SIZE', 4)
+    visited = crawler.VisitedSet(100)
+    urls = [f'{DOCS}page-{number}.html' for number in range(10)]
+    assert all(visited.add(url) for url in urls)
+    assert len(visited.hashes) == 8 and len(visited.recent) == 2
+    assert list(visited.hashes) == sorted(visited.hashes)
+    assert not any(visited.add(url) for url in urls)
+    assert len(visited) == 10
+
+
+def test_crawl_state_checkpoint(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    state = crawler.CrawlState(DOCS, DOCS, 1, 100)
+    state.pop_batch(10)
+    state.push(f'{DOCS}library/', 1)
+    state.push(f'{DOCS}library/deep/', 2)
+    state.push('https://peps.python.org/', 1)
+    state.push(f'{DOCS}archives/python.zip', 1)
+    state.save(path)
+    loaded, resumed = crawler.CrawlState.load(path, DOCS, DOCS, 1, 100)
+    assert resumed
+    assert list(loaded.frontier) == [(f'{DOCS}library/', 1)]
+    assert not loaded.visited.add(DOCS)
+    _, resumed = crawler.CrawlState.load(path, DOCS, DOCS, 3, 100)
+    assert not resumed
+
+
+def test_crawl_state_checkpoint_is_append_only(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    state = crawler.CrawlState(DOCS, DOCS, 2, 100)
+    state.pop_batch(1)
+    state.push(f'{DOCS}library/', 1)
+    state.push(f'{DOCS}tutorial/', 1)
+    state.save(path)
+    first = path.read_text()
+    state.pop_batch(1)
+    state.push(f'{DOCS}library/os.html', 2)
+    state.save(path)
+    assert path.read_text().startswith(first)
+    assert len(path.read_text().splitlines()) == 3
+    # обрыв при дописывании строки
+    with path.open('a') as checkpoint:
+        checkpoint.write('{"pushed": [["' + DOCS)
+    loaded, resumed = crawler.CrawlState.load(path, DOCS, DOCS, 2, 100)
+    assert resumed
+    assert list(loaded.frontier) == [
+        (f'{DOCS}tutorial/', 1), (f'{DOCS}library/os.html', 2)]
+    assert not loaded.visited.add(f'{DOCS}library/')
+    assert path.read_text().endswith('\n')
+    loaded.pop_batch(1)
+    loaded.save(path)
+    loaded, _ = crawler.CrawlState.load(path, DOCS, DOCS, 2, 100)
+    assert list(loaded.frontier) == [(f'{DOCS}library/os.html', 2)]
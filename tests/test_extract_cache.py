@@ -0,0 +1,59 @@
+import pytest
+try:
+    from src import extract_cache
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `extract_cache.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `extract_cache.py`'
+
+
+def title(content):
+    return content.decode().upper()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with extract_cache.ExtractCache(tmp_path / 'extract.sqlite3', 2) as cache:
+        yield cache
+
+
+def test_extract_cache_round_trip(cache):
+    key = extract_cache.extractor_key(title, b'pep')
+    with pytest.raises(KeyError):
+        cache.get(key)
+    cache.save(key, ('PEP', {'Status': 'Final'}))
+    assert cache.get(key) == ('PEP', {'Status': 'Final'})
+    assert key[0].endswith('test_extract_cache.title')
+    assert key != extract_cache.extractor_key(title, b'other')
+
+
+def test_extract_cache_drops_old_versions(cache):
+    name, version, digest = extract_cache.extractor_key(title, b'pep')
+    cache.save((name, 'old', digest), 'stale')
+    cache.save((name, version, digest), 'fresh')
+    with pytest.raises(KeyError):
+        cache.get((name, 'old', digest))
+
+
+def test_extract_cache_evicts_least_recently_used(cache, monkeypatch):
+    clock = iter(range(0, 10_000, 100))
+    monkeypatch.setattr(extract_cache, 'time', lambda: next(clock))
+    keys = [extract_cache.extractor_key(title, page) for page in (
+        b'a', b'b', b'c')]
+    cache.save(keys[0], 'a')
+    cache.save(keys[1], 'b')
+    cache.get(keys[0])
+    cache.save(keys[2], 'c')
+    assert cache.get(keys[0]) == 'a'
+    assert cache.get(keys[2]) == 'c'
+    with pytest.raises(KeyError):
+        cache.get(keys[1])
+
+
+def test_extract_cache_skips_recent_access_updates(cache):
+    key = extract_cache.extractor_key(title, b'pep')
+    cache.save(key, 'PEP')
+    changes = cache.connection.total_changes
+    for _ in range(3):
+        assert cache.get(key) == 'PEP'
+    assert cache.connection.total_changes == changes
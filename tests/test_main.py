@@ -1,11 +1,21 @@
-import pytest
+import logging
+import subprocess
+import sys
+from argparse import Namespace
+from datetime import date
+from collections.abc import Iterator
 from pathlib import Path
+
+import pytest
+import requests_mock
 try:
     from src import main
 except ModuleNotFoundError:
     assert False, 'Убедитесь что в директории `src` есть файл `main.py`'
 except ImportError:
     assert False, 'Убедитесь что в директории `src` есть файл `main.py`'
+# main импортирует utils по пути src
+import utils
 
 
 def test_main_file():
@@ -33,9 +43,10 @@ def test_main_file():
 def test_whats_new(mock_session):
     got = main.whats_new(mock_session)
     header = ('Ссылка на статью', 'Заголовок', 'Редактор, Автор')
-    assert isinstance(got, list), (
-        'Функция `whats_new` должна возвращать объект типа `list`'
+    assert isinstance(got, Iterator), (
+        'Функция `whats_new` должна возвращать генератор строк'
     )
+    got = list(got)
     assert len(got) > 0, (
         'Убедитесь что функция `whats_new` модуля `main.py` '
         'возвращает непустой список'
@@ -54,9 +65,10 @@ def test_whats_new(mock_session):
 @pytest.mark.skip()
 def test_latest_versions(mock_session):
     got = main.latest_versions(mock_session)
-    assert isinstance(got, list), (
-        'Функция `latest_versions` должна возвращать объект типа `list`'
+    assert isinstance(got, Iterator), (
+        'Функция `latest_versions` должна возвращать генератор строк'
     )
+    got = list(got)
     assert isinstance(got[0], tuple), (
         'Функция `latest_versions` должна вернуть список `result`, '
         'элементами которого должны быть объекты типа `tuple`'
@@ -123,7 +135,10 @@ def test_mode_to_function():
             f'{name_func} - это строка.'
         )
         assert (
-            name_func in ['whats-new', 'latest-versions', 'download', 'pep']
+            name_func in [
+                'whats-new', 'latest-versions', 'download', 'pep',
+                'pep-metadata', 'crawl', 'index', 'search'
+            ]
         ), (
             'В модуле `main.py` в объекте `MODE_TO_FUNCTION` '
             f'нет ключа `{name_func}`'
@@ -134,9 +149,539 @@ def test_mode_to_function():
         )
         assert (
             func.__name__ in [
-                'whats_new', 'latest_versions', 'download', 'pep'
+                'whats_new', 'latest_versions', 'download', 'pep',
+                'pep_metadata', 'crawl', 'build_index', 'search'
             ]
         ), (
             'В модуле `main.py` в объекте `MODE_TO_FUNCTION` '
             f'нет значения {func}'
         )
+
+
+PEP_INDEX_PAGE = (
+    '<html><body><table>'
+    '<tr><th>Тип</th><th>PEP</th></tr>'
+    '<tr><td><abbr>SF</abbr></td><td><a href="pep-0001/">1</a></td></tr>'
+    '<tr><td><abbr>IA</abbr></td><td><a href="pep-0002/">2</a></td></tr>'
+    '<tr><td><abbr>S</abbr></td><td><a href="pep-0003/">3</a></td></tr>'
+    '<tr><td></td><td><a href="pep-0004/">4</a></td></tr>'
+    '</table></body></html>'
+)
+PEP_ARTICLE_PAGE = (
+    '<html><body><dl><dt>Title:</dt><dd>PEP</dd>'
+    '<dt>Status:</dt><dd>{status}</dd></dl></body></html>'
+)
+
+
+@pytest.fixture
+def pep_site(monkeypatch, tmp_path, mock_session):
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    with requests_mock.Mocker(session=mock_session) as mock:
+        mock.get(main.PEPS_URL, text=PEP_INDEX_PAGE)
+        for num, status in (
+            ('0001', 'Final'), ('0002', 'Active'), ('0003', 'Accepted')
+        ):
+            mock.get(
+                f'{main.PEPS_URL}pep-{num}/',
+                text=PEP_ARTICLE_PAGE.format(status=status))
+        yield mock
+
+
+@pytest.mark.parametrize('workers, parser', [
+    (1, 'bs4'), (4, 'bs4'), (4, 'lxml')])
+def test_pep_counts_statuses(pep_site, mock_session, workers, parser):
+    got = list(main.pep(
+        mock_session, Namespace(workers=workers, parser=parser)))
+    assert got == [
+        ('Статус', 'Количество'),
+        ('Final', 1),
+        ('Active', 1),
+        ('Accepted', 1),
+        ('Все PEP', 3),
+    ]
+
+
+def test_pep_logs_unexpected_status(pep_site, mock_session, caplog):
+    caplog.set_level(logging.INFO)
+    list(main.pep(mock_session))
+    assert 'pep-0003/' in caplog.text
+    assert 'В таблице не найден статус для статьи 4' in caplog.text
+
+
+WHATS_NEW_INDEX_PAGE = (
+    '<html><body><section id="what-s-new-in-python">'
+    '<div class="toctree-wrapper"><ul>{items}</ul></div>'
+    '</section></body></html>'
+)
+WHATS_NEW_ARTICLE_PAGE = (
+    '<html><body><section><h1>What’s New In Python {version}¶</h1>'
+    '<dl><dt>Editor:</dt>\n<dd>Author {version}</dd></dl>'
+    '</section></body></html>'
+)
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_whats_new_keeps_toctree_order(mock_session, parser):
+    versions = ['3.11', '3.10', '3.9', '3.8']
+    with requests_mock.Mocker(session=mock_session) as mock:
+        mock.get(main.WHATS_NEW_URL, text=WHATS_NEW_INDEX_PAGE.format(
+            items=''.join(
+                f'<li class="toctree-l1"><a href="{version}.html">'
+                f'{version}</a></li>' for version in versions)))
+        for version in versions:
+            mock.get(
+                f'{main.WHATS_NEW_URL}{version}.html',
+                text=WHATS_NEW_ARTICLE_PAGE.format(version=version))
+        got = list(main.whats_new(
+            mock_session, Namespace(workers=4, parser=parser)))
+    assert [row[0] for row in got[1:]] == [
+        f'{main.WHATS_NEW_URL}{version}.html' for version in versions]
+    assert got[1][1] == 'What’s New In Python 3.11'
+    assert got[1][2] == 'Editor: Author 3.11'
+
+
+ARCHIVE_URL = 'https://docs.python.org/3/archives/python-docs-html.zip'
+ARCHIVE = b'0123456789' * 100
+
+
+@pytest.fixture
+def archive_site(mock_session):
+    def archive_body(request, context):
+        start = 0
+        if 'Range' in request.headers:
+            start = int(request.headers['Range'][6:-1])
+            context.status_code = 206
+        return ARCHIVE[start:]
+
+    # архивы загружаются отдельной сессией без кеша, поэтому
+    # подменяется транспорт всех сессий
+    with requests_mock.Mocker() as mock:
+        mock.get(main.DOWNLOADS_URL, text=(
+            '<html><body><table class="docutils"><tr><td>'
+            '<a href="archives/python-docs-html.zip">zip</a>'
+            '</td></tr></table></body></html>'))
+        mock.head(ARCHIVE_URL, headers={
+            'Content-Length': str(len(ARCHIVE)), 'ETag': '"v1"'})
+        mock.get(ARCHIVE_URL, content=archive_body)
+        yield mock
+
+
+def test_download_streams_archive(
+    monkeypatch, tmp_path, mock_session, archive_site
+):
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    main.download(mock_session)
+    archive = tmp_path / 'downloads' / 'python-docs-html.zip'
+    assert archive.read_bytes() == ARCHIVE
+    assert (tmp_path / 'downloads' / 'python-docs-html.zip.etag'
+            ).read_text() == '"v1"'
+    assert not mock_session.cache.has_url(ARCHIVE_URL)
+
+
+def test_download_keeps_shared_session_cached(
+    monkeypatch, tmp_path, mock_session, archive_site
+):
+    # страницы других режимов, загружаемые во время скачивания архива,
+    # по-прежнему берутся из кеша общей сессии
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    from_cache = []
+
+    def archive_body(request, context):
+        from_cache.append(mock_session.get(main.DOWNLOADS_URL).from_cache)
+        return ARCHIVE
+
+    archive_site.get(ARCHIVE_URL, content=archive_body)
+    main.download(mock_session)
+    assert from_cache == [True]
+    assert not mock_session.cache.contains(url=ARCHIVE_URL)
+
+
+def test_download_resumes_partial_archive(
+    monkeypatch, tmp_path, mock_session, archive_site
+):
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    (downloads / 'python-docs-html.zip').write_bytes(ARCHIVE[:300])
+    (downloads / 'python-docs-html.zip.etag').write_text('"v1"')
+    main.download(mock_session)
+    assert (downloads / 'python-docs-html.zip').read_bytes() == ARCHIVE
+    assert archive_site.request_history[-1].headers['Range'] == 'bytes=300-'
+
+
+def test_download_skips_unchanged_archive(
+    monkeypatch, tmp_path, mock_session, archive_site
+):
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    (downloads / 'python-docs-html.zip').write_bytes(ARCHIVE)
+    (downloads / 'python-docs-html.zip.etag').write_text('"v1"')
+    main.download(mock_session)
+    assert archive_site.request_history[-1].method == 'HEAD'
+
+
+def test_pep_warm_run_uses_index(pep_site, mock_session):
+    list(main.pep(mock_session))
+    mock_session.cache.clear()
+    pep_site.reset_mock()
+    got = list(main.pep(mock_session))
+    assert got[-1] == ('Все PEP', 3)
+    assert [request.url for request in pep_site.request_history] == [
+        main.PEPS_URL]
+
+
+def test_pep_refetches_changed_rows(pep_site, mock_session):
+    list(main.pep(mock_session))
+    mock_session.cache.clear()
+    pep_site.get(main.PEPS_URL, text=PEP_INDEX_PAGE.replace(
+        '<abbr>S</abbr>', '<abbr>SA</abbr>'))
+    pep_site.reset_mock()
+    list(main.pep(mock_session))
+    assert [request.url for request in pep_site.request_history] == [
+        main.PEPS_URL, f'{main.PEPS_URL}pep-0003/']
+
+
+def test_pep_revalidates_with_conditional_get(pep_site, mock_session):
+    pep_site.get(
+        f'{main.PEPS_URL}pep-0001/',
+        text=PEP_ARTICLE_PAGE.format(status='Final'),
+        headers={'ETag': '"pep-1"'})
+    list(main.pep(mock_session))
+    mock_session.cache.clear()
+    pep_site.get(f'{main.PEPS_URL}pep-0001/', status_code=304)
+    pep_site.reset_mock()
+    got = list(main.pep(
+        mock_session, Namespace(revalidate=True, workers=1)))
+    assert ('Final', 1) in got
+    assert pep_site.request_history[1].headers['If-None-Match'] == '"pep-1"'
+
+
+def test_pep_fast_fetches_only_ambiguous_codes(pep_site, mock_session):
+    got = list(main.pep(mock_session, Namespace(fast=True, workers=1)))
+    assert ('Final', 1) in got and got[-1] == ('Все PEP', 3)
+    assert [request.url for request in pep_site.request_history] == [
+        main.PEPS_URL,
+        f'{main.PEPS_URL}pep-0002/',
+        f'{main.PEPS_URL}pep-0003/']
+
+
+def test_pep_fast_verifies_sampled_articles(pep_site, mock_session):
+    list(main.pep(
+        mock_session, Namespace(fast=True, verify_rate=1.0, workers=1)))
+    assert f'{main.PEPS_URL}pep-0001/' in [
+        request.url for request in pep_site.request_history]
+
+
+def test_pep_metadata_emits_typed_records(pep_site, mock_session):
+    pep_site.get(f'{main.PEPS_URL}pep-0001/', text=(
+        '<html><body><dl><dt>Author:</dt><dd>Barry, Guido</dd>'
+        '<dt>Status:</dt><dd>Final</dd><dt>Type:</dt><dd>Process</dd>'
+        '<dt>Created:</dt><dd>13-Jun-2000</dd>'
+        '<dt>Post-History:</dt><dd>21-Mar-2001</dd></dl></body></html>'))
+    rows = list(main.pep_metadata(mock_session, Namespace(workers=1)))
+    header = rows[0]
+    assert header[:3] == ('PEP', 'Title', 'URL')
+    record = dict(zip(header, rows[1]))
+    assert record['PEP'] == 1
+    assert record['URL'] == f'{main.PEPS_URL}pep-0001/'
+    assert record['Author'] == 'Barry, Guido'
+    assert record['Created'] == date(2000, 6, 13)
+    assert record['Python-Version'] is None
+    assert [row[0] for row in rows[1:]] == [1, 2, 3]
+
+
+def test_pep_metadata_reuses_articles_fetched_by_pep(pep_site, mock_session):
+    list(main.pep(mock_session, Namespace(workers=1)))
+    mock_session.cache.clear()
+    pep_site.reset_mock()
+    rows = list(main.pep_metadata(mock_session, Namespace(workers=1)))
+    assert [row[0] for row in rows[1:]] == [1, 2, 3]
+    assert [request.url for request in pep_site.request_history] == [
+        main.PEPS_URL]
+
+
+PEPS_API_JSON = {
+    str(num): {
+        'number': num,
+        'status': status,
+        'url': f'https://peps.python.org/pep-{num:04d}/',
+    }
+    for num, status in ((1, 'Final'), (2, 'Active'), (3, 'Superseded'))
+}
+
+
+def test_pep_api_source(pep_site, mock_session):
+    pep_site.get(main.PEPS_API_URL, json=PEPS_API_JSON)
+    got = list(main.pep(mock_session, Namespace(pep_source='api')))
+    assert got == [
+        ('Статус', 'Количество'),
+        ('Final', 1),
+        ('Active', 1),
+        ('Superseded', 1),
+        ('Все PEP', 3),
+    ]
+    assert [request.url for request in pep_site.request_history] == [
+        main.PEPS_API_URL]
+
+
+def test_pep_cross_check_reports_disagreement(
+    pep_site, mock_session, caplog
+):
+    caplog.set_level(logging.INFO)
+    api_json = {**PEPS_API_JSON, '1': {
+        **PEPS_API_JSON['1'], 'status': 'Withdrawn'}}
+    pep_site.get(main.PEPS_API_URL, json=api_json)
+    got = list(main.pep(
+        mock_session, Namespace(pep_source='cross-check', workers=1)))
+    assert ('Withdrawn', 1) in got and ('Superseded', 1) in got
+    assert [request.url for request in pep_site.request_history] == [
+        main.PEPS_API_URL, main.PEPS_URL]
+    assert (
+        "Не совпадают статусы для статьи PEPpep-0001/. "
+        "Ожидаемые: ('Final',), действительный: Withdrawn") in caplog.text
+
+
+def test_pep_sources_agree(pep_site, mock_session):
+    api_json = {**PEPS_API_JSON, '3': {
+        **PEPS_API_JSON['3'], 'status': 'Accepted'}}
+    pep_site.get(main.PEPS_API_URL, json=api_json)
+    html = list(main.pep(mock_session, Namespace(workers=4)))
+    assert list(main.pep(mock_session, Namespace(pep_source='api'))) == html
+    # в числовом указателе повторяются статьи из таблиц категорий:
+    # html и cross-check считают каждую строку таблицы, api — каждую PEP
+    table = PEP_INDEX_PAGE.removeprefix('<html><body>').removesuffix(
+        '</body></html>')
+    pep_site.get(main.PEPS_URL, text=PEP_INDEX_PAGE.replace(
+        '</body>', table + '</body>'))
+    html = list(main.pep(mock_session, Namespace(workers=4)))
+    assert html[-1] == ('Все PEP', 6)
+    assert list(main.pep(
+        mock_session, Namespace(pep_source='cross-check', workers=4))) == html
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_warm_pep_run_does_not_parse_html(
+    pep_site, mock_session, monkeypatch, tmp_path, parser
+):
+    args = Namespace(workers=1, parser=parser)
+    with main.extraction_cache(tmp_path / 'extract.sqlite3', 100):
+        cold = list(main.pep(mock_session, args))
+        monkeypatch.setattr(
+            utils, 'iter_html', pytest.fail, raising=True)
+        monkeypatch.setattr(
+            utils, 'make_soup', pytest.fail, raising=True)
+        assert list(main.pep(mock_session, args)) == cold
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_pep_parses_in_process_pool(pep_site, mock_session, parser):
+    with main.parse_processes(2):
+        got = list(main.pep(
+            mock_session, Namespace(workers=4, parser=parser)))
+    assert got[-1] == ('Все PEP', 3)
+    assert ('Accepted', 1) in got
+
+
+def test_selected_modes():
+    assert main.selected_modes(['pep', 'whats-new', 'pep']) == [
+        'pep', 'whats-new']
+    assert main.selected_modes(['pep', 'all']) == [
+        'whats-new', 'latest-versions', 'download', 'pep']
+    assert main.selected_modes(['all', 'crawl', 'pep']) == [
+        'whats-new', 'latest-versions', 'download', 'pep', 'crawl']
+    assert set(main.MODES_IN_ALL) <= set(main.MODE_TO_FUNCTION)
+
+
+@pytest.mark.parametrize('run_modes', ['run_sequentially', 'run_concurrently'])
+def test_run_modes_share_session(
+    pep_site, mock_session, capsys, run_modes
+):
+    pep_site.get(main.MAIN_DOC_URL, text=(
+        '<html><div class="sphinxsidebarwrapper"><ul>'
+        '<li><a href="https://docs.python.org/3.11/">Python 3.11 (stable)'
+        '</a></li><li><a href="#">All versions</a></li></ul></div></html>'))
+    args = Namespace(output=None, workers=2)
+    metrics_by_mode = getattr(main, run_modes)(
+        mock_session, ['latest-versions', 'pep'], args)
+    captured_out, _ = capsys.readouterr()
+    assert captured_out.index('3.11 stable') < captured_out.index('Все PEP 3')
+    assert metrics_by_mode
+    assert args.output is None and not hasattr(args, 'mode')
+
+
+def test_failing_mode_does_not_stop_others(
+    pep_site, mock_session, capsys, caplog
+):
+    pep_site.get(main.MAIN_DOC_URL, status_code=404, text='<html></html>')
+    main.run_sequentially(
+        mock_session, ['latest-versions', 'pep'], Namespace(output=None))
+    captured_out, _ = capsys.readouterr()
+    assert 'Все PEP 3' in captured_out
+    assert 'latest-versions' in caplog.text
+
+
+def test_watch_outputs_only_changes(
+    pep_site, mock_session, monkeypatch, capsys, caplog
+):
+    def change_site(interval):
+        mock_session.cache.clear()
+        pep_site.get(main.PEPS_URL, text=PEP_INDEX_PAGE.replace(
+            '<abbr>SF</abbr>', '<abbr>SW</abbr>'))
+        pep_site.get(
+            f'{main.PEPS_URL}pep-0001/',
+            text=PEP_ARTICLE_PAGE.format(status='Withdrawn'))
+
+    caplog.set_level(logging.INFO)
+    monkeypatch.setattr(main, 'sleep', change_site)
+    main.watch(
+        mock_session, ['pep'], Namespace(
+            output=None, watch=60, profile=False, metrics_out=None), ticks=2)
+    first_tick, second_tick = capsys.readouterr()[0].split('Статус', 2)[1:]
+    assert 'Final 1' in first_tick and 'Все PEP 3' in first_tick
+    assert 'Withdrawn 1' in second_tick
+    assert 'Active' not in second_tick and 'Все PEP' not in second_tick
+    assert 'строка Final больше не встречается' in caplog.text
+
+
+def test_watch_reports_unchanged_tick(
+    pep_site, mock_session, monkeypatch, caplog
+):
+    caplog.set_level(logging.INFO)
+    monkeypatch.setattr(main, 'sleep', lambda interval: None)
+    main.watch(
+        mock_session, ['pep'], Namespace(
+            output=None, watch=60, profile=False, metrics_out=None), ticks=2)
+    assert 'Режим pep: изменений нет' in caplog.text
+
+
+# бюджет времени импорта main.py без тяжёлых зависимостей, микросекунды
+IMPORT_TIME_BUDGET = 150_000
+LAZY_DEPENDENCIES = (
+    'bs4', 'lxml', 'requests', 'requests_cache', 'tqdm', 'prettytable',
+    'aiohttp')
+
+
+def import_main(*args):
+    return subprocess.run(
+        [sys.executable, *args, '-c',
+         'import sys, main; print(*sorted(sys.modules))'],
+        cwd=Path(main.__file__).parent,
+        capture_output=True,
+        text=True,
+        check=True)
+
+
+def test_main_imports_heavy_dependencies_lazily():
+    loaded = set(import_main().stdout.split())
+    assert not loaded & set(LAZY_DEPENDENCIES), (
+        'Тяжёлые зависимости должны импортироваться при первом использовании'
+    )
+
+
+def test_main_import_time_budget():
+    # берётся лучший из трёх запусков, чтобы не зависеть от шума машины
+    cumulative = min(
+        int(line.split('|')[1])
+        for _ in range(3)
+        for line in import_main('-X', 'importtime').stderr.splitlines()
+        if line.split('|')[-1].strip() == 'main')
+    assert cumulative < IMPORT_TIME_BUDGET, (
+        f'Импорт main.py занимает {cumulative} мкс, '
+        f'бюджет {IMPORT_TIME_BUDGET} мкс'
+    )
+
+
+DOCS_PAGE = (
+    '<html><head><title>{title}</title></head><body>{links}</body></html>')
+DOCS_SITE = {
+    '': ['library/', 'tutorial/index.html#intro', 'https://peps.python.org/'],
+    'library/': ['../', 'os.html', 'archive.zip', 'library/#top'],
+    'tutorial/index.html': ['../library/os.html'],
+    'library/os.html': ['../tutorial/deep.html'],
+}
+
+
+@pytest.fixture
+def docs_site(monkeypatch, tmp_path, mock_session):
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    with requests_mock.Mocker(session=mock_session) as mock:
+        for path, links in DOCS_SITE.items():
+            mock.get(main.MAIN_DOC_URL + path, text=DOCS_PAGE.format(
+                title=path or 'index',
+                links=''.join(f'<a href="{link}">x</a>' for link in links)))
+        yield mock
+
+
+def test_crawl_visits_each_page_once_within_depth(docs_site, mock_session):
+    rows = list(main.crawl(mock_session, Namespace(workers=2, max_depth=2)))
+    assert rows[0] == ('Ссылка', 'Глубина', 'Заголовок')
+    assert sorted(rows[1:]) == [
+        (main.MAIN_DOC_URL, 0, 'index'),
+        (f'{main.MAIN_DOC_URL}library/', 1, 'library/'),
+        (f'{main.MAIN_DOC_URL}library/os.html', 2, 'library/os.html'),
+        (
+            f'{main.MAIN_DOC_URL}tutorial/index.html', 1,
+            'tutorial/index.html'
+        ),
+    ]
+    assert not (main.BASE_DIR / main.CRAWL_CHECKPOINT_NAME).exists()
+
+
+def test_crawl_resumes_from_checkpoint(docs_site, mock_session):
+    args = Namespace(workers=1, max_depth=2)
+    checkpoint = main.BASE_DIR / main.CRAWL_CHECKPOINT_NAME
+    crawled = main.crawl(mock_session, args)
+    for _ in range(3):
+        next(crawled)
+    crawled.close()
+    assert checkpoint.exists()
+    docs_site.reset_mock()
+    resumed = list(main.crawl(mock_session, args))
+    assert [row[0] for row in resumed[1:]] == [
+        f'{main.MAIN_DOC_URL}library/',
+        f'{main.MAIN_DOC_URL}tutorial/index.html',
+        f'{main.MAIN_DOC_URL}library/os.html',
+    ]
+    assert main.MAIN_DOC_URL not in [
+        request.url for request in docs_site.request_history]
+    assert not checkpoint.exists()
+
+
+@pytest.fixture
+def cached_docs_session(monkeypatch, tmp_path, tempfile_session):
+    # Mocker подменяет отправку запросов в обход кеша, поэтому страницы
+    # отдаются через адаптер, как из сети
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    adapter = requests_mock.Adapter()
+    for path, links in DOCS_SITE.items():
+        adapter.register_uri(
+            'GET',
+            main.MAIN_DOC_URL + path,
+            text=DOCS_PAGE.format(
+                title=path or 'index',
+                links=''.join(f'<a href="{link}">x</a>' for link in links)),
+            headers={'Content-Type': 'text/html; charset=utf-8'})
+    tempfile_session.mount('https://', adapter)
+    tempfile_session.adapter = adapter
+    return tempfile_session
+
+
+def test_search_uses_local_index_only(cached_docs_session):
+    args = Namespace(workers=2, max_depth=2, query='os library', limit=2)
+    list(main.crawl(cached_docs_session, args))
+    assert list(main.build_index(cached_docs_session, args)) == [
+        ('Страниц', 'Терминов'), (4, 5)]
+    requests_sent = len(cached_docs_session.adapter.request_history)
+    got = main.search(cached_docs_session, args)
+    assert got[0] == ('Ссылка', 'Заголовок', 'Оценка')
+    assert [row[:2] for row in got[1:]] == [
+        (f'{main.MAIN_DOC_URL}library/os.html', 'library/os.html'),
+        (f'{main.MAIN_DOC_URL}library/', 'library/'),
+    ]
+    assert len(cached_docs_session.adapter.request_history) == requests_sent
+
+
+def test_search_without_query(docs_site, mock_session, caplog):
+    assert main.search(mock_session, Namespace()) is None
+    assert 'укажите запрос' in caplog.text
@@ -0,0 +1,80 @@
+import threading
+import time
+from types import SimpleNamespace
+
+try:
+    from src import metrics
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `metrics.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `metrics.py`'
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert metrics.percentile(values, 50) == 50
+    assert metrics.percentile(values, 95) == 95
+    assert metrics.percentile(values, 99) == 99
+    assert metrics.percentile([], 50) is None
+
+
+def test_timer_excludes_nested_phases():
+    collector = metrics.Metrics()
+    with collector.timer('extract'):
+        with collector.timer('parse'):
+            time.sleep(0.02)
+    phases = collector.summary()['phases']
+    assert phases['parse'] >= 0.02
+    assert phases['extract'] < 0.02
+
+
+def test_phase_spans_do_not_sum_threads():
+    collector = metrics.Metrics()
+
+    def work():
+        with collector.timer('network'):
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = collector.summary()
+    assert summary['phases']['network'] >= 0.2
+    assert 0.05 <= summary['phase_spans']['network'] < 0.15
+
+
+def test_timed_rows_bills_generator_work_to_its_phase(monkeypatch):
+    collector = metrics.Metrics()
+    monkeypatch.setattr(metrics, 'METRICS', collector)
+
+    def rows():
+        for row in range(3):
+            time.sleep(0.02)
+            yield row
+
+    with collector.timer('output'):
+        assert list(metrics.timed_rows(rows())) == [0, 1, 2]
+    phases = collector.summary()['phases']
+    assert phases['other'] >= 0.06
+    assert phases['output'] < 0.02
+
+
+def test_record_response_counts_cache_hits():
+    collector = metrics.Metrics()
+    collector.record_response(
+        SimpleNamespace(from_cache=True, content=b'12345'), 0.1)
+    collector.record_response(
+        SimpleNamespace(from_cache=False, content=b'123'), 0.3)
+    collector.record_response(
+        SimpleNamespace(headers={'Content-Length': '10'}), 0.2,
+        streamed=True)
+    summary = collector.summary(wall_time=1.0)
+    assert summary['requests'] == 3
+    assert summary['cache_hits'] == 1
+    assert summary['cache_hit_rate'] == 1 / 3
+    assert summary['bytes'] == 13
+    assert summary['cached_bytes'] == 5
+    assert summary['latency']['p50'] == 0.2
+    assert summary['wall_time'] == 1.0
@@ -1,3 +1,5 @@
+import json
+import sqlite3
 from datetime import datetime
 from typing import Optional
 from pathlib import Path
@@ -90,3 +92,104 @@ def test_output_file():
     assert hasattr(outputs, 'file_output'), (
         'Напишите функцию `file_output` в модуле `output.py`'
     )
+
+
+def test_file_output_keeps_rows_written_before_failure(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+
+    def rows():
+        yield ('Статус', 'Количество')
+        yield ('Final', 1)
+        raise RuntimeError('обрыв соединения')
+
+    with pytest.raises(RuntimeError):
+        outputs.control_output(rows(), cli_args('pep', 'file'))
+    output_file, = (tmp_path / 'results').glob('*.csv')
+    assert output_file.read_text(encoding='utf-8').splitlines() == [
+        '"Статус","Количество"', '"Final","1"']
+
+
+def test_pretty_output_accepts_generator(capsys):
+    rows = iter([('Статус', 'Количество'), ('Active', 36)])
+    outputs.control_output(rows, cli_args('pep', 'pretty'))
+    captured_out, _ = capsys.readouterr()
+    assert 'Active' in captured_out
+
+
+PEP_ROWS = [('Статус', 'Количество'), ('Active', 36), ('Final', 246)]
+
+
+def test_jsonl_output(monkeypatch, tmp_path):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    outputs.control_output(iter(PEP_ROWS), cli_args('pep', 'jsonl'))
+    output_file, = (tmp_path / 'results').glob('pep_*.jsonl')
+    assert [
+        json.loads(line) for line in output_file.read_text().splitlines()
+    ] == [
+        {'Статус': 'Active', 'Количество': 36},
+        {'Статус': 'Final', 'Количество': 246},
+    ]
+
+
+def test_parquet_output(monkeypatch, tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    outputs.control_output(iter(PEP_ROWS), cli_args('pep', 'parquet'))
+    output_file, = (tmp_path / 'results').glob('pep_*.parquet')
+    assert parquet.read_table(output_file).to_pydict() == {
+        'Статус': ['Active', 'Final'], 'Количество': [36, 246]}
+
+
+def test_parquet_output_promotes_empty_first_batch(monkeypatch, tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    rows = [('PEP', 'Status'), *((number, None) for number in range(
+        outputs.BATCH_SIZE)), (1000, 'Final')]
+    outputs.control_output(iter(rows), cli_args('pep-metadata', 'parquet'))
+    output_file, = (tmp_path / 'results').glob('pep-metadata_*.parquet')
+    table = parquet.read_table(output_file).to_pydict()
+    assert table['Status'][-1] == 'Final'
+    assert table['Status'][:-1] == [None] * outputs.BATCH_SIZE
+
+
+def test_parquet_output_closes_file_on_error(monkeypatch, tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+
+    def rows():
+        yield ('PEP', 'Status')
+        for number in range(outputs.BATCH_SIZE):
+            yield (number, 'Final')
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        outputs.control_output(rows(), cli_args('pep', 'parquet'))
+    output_file, = (tmp_path / 'results').glob('pep_*.parquet')
+    assert parquet.read_table(output_file).num_rows == outputs.BATCH_SIZE
+
+
+def test_sqlite_output_appends_runs(monkeypatch, tmp_path):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    for _ in range(2):
+        outputs.control_output(iter(PEP_ROWS), cli_args('pep', 'sqlite'))
+    with sqlite3.connect(tmp_path / 'results' / 'results.sqlite3') as db:
+        assert db.execute('SELECT id, mode FROM runs').fetchall() == [
+            (1, 'pep'), (2, 'pep')]
+        assert db.execute(
+            'SELECT run_id, "Статус", "Количество" FROM pep'
+        ).fetchall() == [
+            (1, 'Active', 36), (1, 'Final', 246),
+            (2, 'Active', 36), (2, 'Final', 246)]
+
+
+def test_sqlite_output_stores_dates_as_iso(monkeypatch, tmp_path):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    outputs.control_output(
+        iter([('PEP', 'Created'), (1, datetime(2000, 6, 13).date())]),
+        cli_args('pep-metadata', 'sqlite'))
+    with sqlite3.connect(tmp_path / 'results' / 'results.sqlite3') as db:
+        assert db.execute(
+            'SELECT "PEP", "Created" FROM pep_metadata').fetchall() == [
+            (1, '2000-06-13')]
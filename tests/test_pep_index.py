@@ -0,0 +1,39 @@
+import sqlite3
+
+try:
+    from src import pep_index
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `pep_index.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `pep_index.py`'
+
+
+def test_pep_index_round_trip(tmp_path):
+    record = pep_index.PepRecord(
+        'pep-0008/', 'PA', 'Active', '"etag"', None, 1.0)
+    with pep_index.PepIndex(tmp_path / 'index.sqlite3') as index:
+        assert index.get(record.url) is None
+        index.save(record)
+    with pep_index.PepIndex(tmp_path / 'index.sqlite3') as index:
+        assert index.get(record.url) == record
+        index.save(record._replace(article_status='Final'))
+        assert index.get(record.url).article_status == 'Final'
+
+
+def test_pep_index_upgrades_old_schema(tmp_path):
+    path = tmp_path / 'index.sqlite3'
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE peps (url TEXT PRIMARY KEY, table_status TEXT, '
+            'article_status TEXT, etag TEXT, last_modified TEXT, '
+            'fetched_at REAL)')
+        connection.execute(
+            "INSERT INTO peps VALUES ('pep-0001/', 'PF', 'Final', "
+            "NULL, NULL, 1.0)")
+    connection.close()
+    with pep_index.PepIndex(path) as index:
+        assert index.get('pep-0001/').fields is None
+        record = index.get('pep-0001/')._replace(
+            fields={'Status': 'Final', 'Author': 'Łukasz'})
+        index.save(record)
+        assert index.get('pep-0001/') == record
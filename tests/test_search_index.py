@@ -0,0 +1,38 @@
+import pytest
+try:
+    from src import search_index
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `search_index.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `search_index.py`'
+
+
+@pytest.mark.parametrize('numbers', [[], [0, 1, 127, 128, 300, 2 ** 40]])
+def test_varints_round_trip(numbers):
+    assert search_index.decode_varints(
+        search_index.encode_varints(numbers)) == numbers
+
+
+def test_postings_round_trip():
+    postings = [(doc_id, doc_id % 7 + 1) for doc_id in range(1, 5000, 3)]
+    data = search_index.encode_postings(postings)
+    assert search_index.decode_postings(data) == postings
+    assert len(data) < len(postings)
+
+
+def test_tokenize():
+    assert search_index.tokenize('Что нового в Python 3.12: asyncio.run') == [
+        'что', 'нового', 'python', '12', 'asyncio', 'run']
+
+
+def test_search_ranks_with_bm25(tmp_path):
+    with search_index.SearchIndex(tmp_path / 'index.sqlite3') as index:
+        assert index.search('asyncio') == []
+        assert index.build([
+            ('a', 'asyncio', 'asyncio event loop asyncio tasks'),
+            ('b', 'os', 'os path functions and asyncio'),
+            ('c', 'json', 'json encoder ' * 20),
+        ]) == (3, 10)
+        assert [row[0] for row in index.search('asyncio loop')] == ['a', 'b']
+        assert index.search('json', limit=1)[0][:2] == ('c', 'json')
+        assert index.search('missing') == []
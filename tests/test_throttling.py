@@ -0,0 +1,82 @@
+import pytest
+import requests_mock
+try:
+    from src import throttling
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `throttling.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `throttling.py`'
+from src import utils
+
+URL = 'https://peps.python.org/pep-0008/'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limiter_reserves_tokens_per_host():
+    clock = FakeClock()
+    limiter = throttling.RateLimiter(rate=2, burst=2, clock=clock)
+    assert limiter.reserve(URL) == 0
+    assert limiter.reserve(URL) == 0
+    assert limiter.reserve(URL) == pytest.approx(0.5)
+    assert limiter.reserve('https://docs.python.org/3/') == 0
+    clock.now = 2.0
+    assert limiter.reserve(URL) == 0
+
+
+def test_rate_limiter_slows_down_after_429():
+    clock = FakeClock()
+    limiter = throttling.RateLimiter(rate=2, burst=1, clock=clock)
+    limiter.reserve(URL)
+    limiter.feedback(URL, 429)
+    assert limiter.reserve(URL) == pytest.approx(1.0)
+
+
+def test_unlimited_rate_limiter_never_waits():
+    limiter = throttling.RateLimiter(rate=0)
+    assert all(limiter.reserve(URL) == 0 for _ in range(100))
+
+
+@pytest.mark.parametrize('retry_after, expected', [
+    ('7', 7.0),
+    ('Thu, 01 Jan 1970 00:00:00 GMT', 0.0),
+])
+def test_backoff_delay_honors_retry_after(retry_after, expected):
+    assert throttling.backoff_delay(3, retry_after) == expected
+
+
+def test_backoff_delay_is_jittered_exponentially():
+    for attempt in range(4):
+        delay = throttling.backoff_delay(attempt)
+        full = throttling.BACKOFF_BASE * 2 ** attempt
+        assert full / 2 <= delay <= full
+
+
+def test_get_response_retries_transient_errors(monkeypatch, mock_session):
+    delays = []
+    monkeypatch.setattr(utils, 'sleep', delays.append)
+    with requests_mock.Mocker(session=mock_session) as mock:
+        mock.get(URL, [
+            {'status_code': 503, 'headers': {'Retry-After': '2'}},
+            {'status_code': 429, 'headers': {'Retry-After': '1'}},
+            {'text': 'ok'},
+        ])
+        response = utils.get_response(mock_session, URL)
+    assert response.text == 'ok'
+    assert delays == [2.0, 1.0]
+
+
+def test_get_response_returns_last_response(monkeypatch, mock_session):
+    monkeypatch.setattr(utils, 'sleep', lambda delay: None)
+    mock_session.retries = 1
+    with requests_mock.Mocker(session=mock_session) as mock:
+        mock.get(URL, status_code=502)
+        response = utils.get_response(mock_session, URL)
+        assert response.status_code == 502
+        assert mock.call_count == 2
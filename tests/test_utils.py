@@ -1,3 +1,5 @@
+import itertools
+
 import pytest
 import requests
 import requests_mock
@@ -54,3 +56,106 @@ def test_get_response(mock_session):
             'делает запрос к странице и возвращает ответ. \n'
             'Кстати: You are breathtaken!'
         )
+
+
+def test_map_concurrently_keeps_order_and_errors():
+    def invert(number):
+        return 1 / number
+
+    got = list(utils.map_concurrently(invert, [1, 0, 4], workers=3))
+    assert [result for result, _ in got] == [1, None, 0.25]
+    assert isinstance(got[1][1], ZeroDivisionError)
+
+
+def test_map_with_items_pulls_input_lazily():
+    pulled = []
+
+    def numbers():
+        for number in itertools.count():
+            pulled.append(number)
+            yield number
+
+    got = list(itertools.islice(
+        utils.map_with_items(lambda number: number * 2, numbers(), 2), 3))
+    assert got == [(0, 0, None), (1, 2, None), (2, 4, None)]
+    # в очереди пула не больше workers * WINDOW_PER_WORKER элементов
+    assert len(pulled) <= 3 + 2 * utils.WINDOW_PER_WORKER
+
+
+def rows_extractor(content):
+    yield from content.decode()
+
+
+def test_iter_extracted_skips_long_results(monkeypatch, tmp_path):
+    from src.extract_cache import extractor_key
+
+    monkeypatch.setattr(utils, 'MEMOIZED_ITEMS_LIMIT', 2)
+    with utils.extraction_cache(tmp_path / 'extract.sqlite3', 10):
+        for content in (b'ab', b'abc'):
+            assert list(utils.iter_extracted(
+                rows_extractor, content)) == list(content.decode())
+        cache = utils.EXTRACT_CACHE
+        assert cache.get(extractor_key(rows_extractor, b'ab')) == ['a', 'b']
+        with pytest.raises(KeyError):
+            cache.get(extractor_key(rows_extractor, b'abc'))
+
+
+ARTICLE = (
+    '<html><head><meta charset="utf-8"></head><body><section>'
+    '<h1>PEP 8 – Style Guide¶</h1>'
+    '<dl class="rfc2822"><dt>Author:</dt><dd>Guido, Łukasz</dd>\n'
+    '<dt>Status:</dt><dd>Active</dd></dl>'
+    '<dl><dt>Other:</dt><dd>ignored</dd></dl>'
+    '</section></body></html>'
+).encode('utf-8')
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_extract_fields(parser):
+    assert utils.extract_fields(ARTICLE, parser) == {
+        'Author': 'Guido, Łukasz', 'Status': 'Active'}
+    assert utils.extract_fields(b'<html><p>no dl</p></html>', parser) == {}
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_extract_section(parser):
+    assert utils.extract_section(ARTICLE, parser) == (
+        'PEP 8 – Style Guide', 'Author:Guido, Łukasz Status:Active')
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_extract_section_ignores_dl_before_section(parser):
+    content = (
+        '<html><body><nav><h1>Навигация</h1>'
+        '<dl><dt>Меню</dt><dd>ссылки</dd></dl></nav>'
+        '<section><h1>What’s New¶</h1><section><h2>Summary</h2></section>'
+        '<dl><dt>Editor:</dt><dd>Guido</dd></dl></section>'
+        '</body></html>'
+    ).encode('utf-8')
+    assert utils.extract_section(content, parser) == (
+        'What’s New', 'Editor:Guido')
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_extract_tolerates_invalid_utf8(parser):
+    content = ARTICLE.replace('Guido'.encode(), b'Gu\xffido')
+    assert utils.extract_fields(content, parser)['Status'] == 'Active'
+    assert utils.extract_section(content, parser)[0] == 'PEP 8 – Style Guide'
+
+
+def test_iter_table_rows():
+    content = (
+        '<html><body><table>'
+        '<tr><th>Тип</th><th>PEP</th><th>Название</th></tr>'
+        '<tr><td><abbr>SF</abbr></td><td><a href="pep-0001/">1</a></td>'
+        '<td><a href="pep-0001/">PEP Purpose</a></td></tr>'
+        '<tr><td></td><td><a href="pep-0004/">4</a></td></tr>'
+        '</table><p>text</p><table>'
+        '<tr><td><abbr>IA</abbr></td><td><a href="pep-0002/">2</a></td></tr>'
+        '</table></body></html>'
+    ).encode('utf-8')
+    assert list(utils.iter_table_rows(content)) == [
+        (1, 'SF', 'pep-0001/', 'PEP Purpose'),
+        (1, None, 'pep-0004/', '4'),
+        (2, 'IA', 'pep-0002/', '2'),
+    ]